@@ -1,20 +1,31 @@
 from scraper.providers import get_scraper
-from storage.csv_store import CSVStore
+from storage.sqlite_store import SQLiteStore
 from agents.seller_agent import SellerAgent
 from agents.buyer_agent import BuyerAgent
 from model_persistence import get_last_model_index, save_last_model_index
+import threading
 import time
 
+_SHARED = None
+_SHARED_LOCK = threading.Lock()
+
+def _shared_services():
+    """Scraper, seller and store keep no per-search state, so one set serves every controller"""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = (get_scraper(), SellerAgent(), SQLiteStore())
+    return _SHARED
+
 class NegotiationController:
     def __init__(self, query, budget, sources, max_results=5):
         self.query = query
         self.budget = budget
         self.sources = sources
         self.max_results = max_results  # User-configurable limit
-        self.scraper = get_scraper() # Keeping original import, assuming DirectSearchScraper is not meant to be imported here
         self.buyer = BuyerAgent(budget)
-        self.seller = SellerAgent()
-        self.store = CSVStore() # Keeping original import, assuming ProductStore is not meant to be imported here
+        # Built once per process instead of per request (scraper setup, SQLite connection)
+        self.scraper, self.seller, self.store = _shared_services()
     
     def search_products(self):
         """Phase 1: Only scrape products and return them"""
@@ -127,10 +138,14 @@ class NegotiationController:
                         except Exception as fallback_error:
                             print(f"   ❌ Fallback also failed: {fallback_error}")
                 else:
-                    # Normal source selection (Amazon/Flipkart)
-                    if not self.sources or 'amazon' in self.sources:
-                        print(f"📦 Searching Amazon...")
-                        amazon_results = self.scraper.search_amazon(self.query, count=self.max_results)
+                    # Normal source selection (Amazon/Flipkart), both sites fetched at once
+                    wanted = [s for s in ('amazon', 'flipkart') if not self.sources or s in self.sources]
+                    for source in wanted:
+                        print(f"📦 Searching {source.title()}...")
+                    by_source = self.scraper.search_all(self.query, wanted, count=self.max_results) if wanted else {}
+                    
+                    if 'amazon' in by_source:
+                        amazon_results = by_source['amazon']
                         
                         # If Amazon returned no results (likely CAPTCHA), use Google Shopping fallback
                         if not amazon_results:
@@ -147,9 +162,8 @@ class NegotiationController:
                         
                         products.extend(amazon_results)
                         
-                    if not self.sources or 'flipkart' in self.sources:
-                        print(f"📦 Searching Flipkart...")
-                        flipkart_results = self.scraper.search_flipkart(self.query, count=self.max_results)
+                    if 'flipkart' in by_source:
+                        flipkart_results = by_source['flipkart']
                         products.extend(flipkart_results)
                         print(f"   ✅ Flipkart: {len(flipkart_results)} products")
                     
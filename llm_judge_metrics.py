@@ -15,11 +15,50 @@ import json
 from typing import List, Dict, Tuple, Optional
 import math
 
+try:
+    import numpy as np  # optional: vectorised counting for large label arrays
+except ImportError:
+    np = None
+
+try:
+    from numba import njit  # compiles _report_kernel to native code (cached on disk after first run)
+except ImportError:
+    njit = None
+
 
 # ============================================================================
 # BINARY CLASSIFICATION METRICS
 # ============================================================================
 
+def to_int8(labels):
+    """
+    Coerce 0/1 labels to an int8 array once, for callers that reuse them.
+    
+    Arrays that already are int8 are returned as-is, so the metric functions
+    below skip the conversion; without numpy the labels pass through unchanged.
+    Raises ValueError for values the cast would change (fractions, overflow).
+    """
+    if np is None or (isinstance(labels, np.ndarray) and labels.dtype == np.int8):
+        return labels
+    labels = np.asarray(labels)
+    coerced = labels.astype(np.int8)
+    if not np.array_equal(coerced, labels):
+        raise ValueError("Labels must be 0 or 1")
+    return coerced
+
+
+def _check_labels(y_true, y_pred) -> None:
+    """Raise ValueError unless y_true and y_pred are equal-length sequences of 0/1"""
+    if len(y_true) != len(y_pred):
+        raise ValueError(f"y_true and y_pred differ in length: {len(y_true)} != {len(y_pred)}")
+    if np is not None and isinstance(y_true, np.ndarray) and isinstance(y_pred, np.ndarray):
+        invalid = bool(((y_true | y_pred) & ~1).any())  # int8 arrays from to_int8
+    else:
+        invalid = not set(y_true).union(y_pred) <= {0, 1}
+    if invalid:
+        raise ValueError("Labels must be 0 or 1")
+
+
 def compute_confusion_matrix(
     y_true: List[int],
     y_pred: List[int]
@@ -27,24 +66,38 @@ def compute_confusion_matrix(
     """
     Compute confusion matrix for binary classification.
     
+    Each (true, pred) pair is keyed as 2*true + pred, so one counting pass
+    fills all four cells: 0 = TN, 1 = FP, 2 = FN, 3 = TP.
+    
     Args:
-        y_true: Ground truth labels (0 or 1)
-        y_pred: Predicted labels (0 or 1)
+        y_true: Ground truth labels (0 or 1), list or array
+        y_pred: Predicted labels (0 or 1), list or array
         
     Returns:
         Dictionary with TP, TN, FP, FN counts
+        
+    Raises:
+        ValueError: If the lengths differ or a label is not 0 or 1
     """
-    tp = sum(1 for true, pred in zip(y_true, y_pred) if true == 1 and pred == 1)
-    tn = sum(1 for true, pred in zip(y_true, y_pred) if true == 0 and pred == 0)
-    fp = sum(1 for true, pred in zip(y_true, y_pred) if true == 0 and pred == 1)
-    fn = sum(1 for true, pred in zip(y_true, y_pred) if true == 1 and pred == 0)
+    if np is not None:
+        yt = to_int8(y_true)
+        yp = to_int8(y_pred)
+        _check_labels(yt, yp)
+        counts = np.bincount((yt << 1) | yp, minlength=4).tolist()
+        total = int(yt.size)
+    else:
+        _check_labels(y_true, y_pred)
+        counts = [0, 0, 0, 0]
+        for true, pred in zip(y_true, y_pred):
+            counts[2 * int(true) + int(pred)] += 1
+        total = len(y_true)
     
     return {
-        'true_positive': tp,
-        'true_negative': tn,
-        'false_positive': fp,
-        'false_negative': fn,
-        'total': len(y_true)
+        'true_positive': counts[3],
+        'true_negative': counts[0],
+        'false_positive': counts[1],
+        'false_negative': counts[2],
+        'total': total
     }
 
 
@@ -146,6 +199,10 @@ def compute_roc_auc(
     AUC is the probability that a randomly chosen positive example
     has a higher score than a randomly chosen negative example.
     
+    U is read off the rank sum of the positives (tied scores share their
+    average rank, which counts each tie as 0.5), so the cost is one sort
+    rather than a comparison of every positive/negative pair.
+    
     Args:
         y_true: Ground truth binary labels (0 or 1)
         y_scores: Predicted scores (continuous, e.g., purchase probability)
@@ -160,24 +217,77 @@ def compute_roc_auc(
     if n_pos == 0 or n_neg == 0:
         return 0.5  # Undefined, return random baseline
     
-    # Calculate using Mann-Whitney U statistic
-    # Count how many times a positive score is greater than a negative score
-    n_correct = 0
-    n_ties = 0
-    
-    for i, (score_i, label_i) in enumerate(zip(y_scores, y_true)):
-        if label_i == 1:  # Positive example
-            for j, (score_j, label_j) in enumerate(zip(y_scores, y_true)):
-                if label_j == 0:  # Negative example
-                    if score_i > score_j:
-                        n_correct += 1
-                    elif score_i == score_j:
-                        n_ties += 1
-    
-    # Calculate AUC (ties count as 0.5)
-    auc = (n_correct + 0.5 * n_ties) / (n_pos * n_neg)
+    if _constant_scores(y_scores):
+        return 0.5  # Every positive/negative pair is a tie
     
-    return auc
+    return _auc_from_rank_sum(_positive_rank_sum(y_true, y_scores), n_pos, n_neg)
+
+
+def _constant_scores(y_scores: List[float]) -> bool:
+    """True if all scores are equal (AUC is then exactly 0.5, no sort needed)"""
+    if np is not None:
+        s = np.asarray(y_scores, dtype=np.float64)
+        return s.size > 0 and bool((s == s[0]).all())
+    return len(y_scores) > 0 and all(score == y_scores[0] for score in y_scores)
+
+
+def _auc_from_rank_sum(rank_sum: float, n_pos: int, n_neg: int) -> float:
+    """AUC = U / (n_pos * n_neg), where U = (sum of positive ranks) - n_pos(n_pos+1)/2"""
+    if n_pos == 0 or n_neg == 0:
+        return 0.5  # Undefined, return random baseline
+    return (rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+
+def _positive_rank_sum(y_true: List[int], y_scores: List[float]) -> float:
+    """Sum of the 1-based ranks of the positives' scores, ties given their average rank"""
+    if np is not None:
+        _, inverse, counts = np.unique(
+            np.asarray(y_scores, dtype=np.float64), return_inverse=True, return_counts=True
+        )
+        # Each distinct score covers ranks (end - count + 1) .. end; the average is end - (count - 1) / 2
+        avg_rank = np.cumsum(counts) - (counts - 1) / 2
+        return float(avg_rank[inverse.ravel()][np.asarray(y_true) == 1].sum())
+    
+    order = sorted(range(len(y_scores)), key=y_scores.__getitem__)
+    rank_sum = 0.0
+    start = 0
+    while start < len(order):
+        # Walk one run of equal scores
+        end = start
+        n_pos_run = 0
+        while end < len(order) and y_scores[order[end]] == y_scores[order[start]]:
+            n_pos_run += y_true[order[end]] == 1
+            end += 1
+        rank_sum += n_pos_run * (start + end + 1) / 2
+        start = end
+    return rank_sum
+
+
+def _report_kernel(y_true, y_pred, y_scores):
+    """Confusion counts and positive rank sum over int8/float64 arrays in flat loops.
+    
+    Returns (tn, fp, fn, tp, rank_sum); rank_sum is 0.0 when y_scores is empty.
+    """
+    counts = np.zeros(4, dtype=np.int64)
+    for i in range(y_true.size):
+        counts[2 * y_true[i] + y_pred[i]] += 1
+    
+    rank_sum = 0.0
+    if y_scores.size:
+        order = np.argsort(y_scores, kind='mergesort')
+        start = 0
+        while start < order.size:
+            end = start
+            n_pos_run = 0
+            while end < order.size and y_scores[order[end]] == y_scores[order[start]]:
+                n_pos_run += y_true[order[end]] == 1
+                end += 1
+            rank_sum += n_pos_run * (start + end + 1) / 2
+            start = end
+    return counts[0], counts[1], counts[2], counts[3], rank_sum
+
+if njit is not None:
+    _report_kernel = njit(cache=True, nogil=True)(_report_kernel)
 
 
 # ============================================================================
@@ -192,6 +302,13 @@ def compute_classification_report(
     """
     Compute comprehensive classification metrics.
     
+    The labels are counted once: precision, recall and accuracy all read
+    the same confusion matrix, F1 reuses precision and recall, and ROC-AUC
+    takes its class sizes from the matrix (n_pos = TP + FN), so the scores
+    only add the one sort behind the positives' rank sum. This relies on
+    y_true, y_pred and y_scores having equal lengths, which is checked first
+    (the compiled kernel indexes all three without bounds checks).
+    
     Args:
         y_true: Ground truth labels (0 or 1)
         y_pred: Predicted labels (0 or 1)
@@ -199,8 +316,32 @@ def compute_classification_report(
         
     Returns:
         Dictionary containing all metrics
+        
+    Raises:
+        ValueError: If the lengths differ or a label is not 0 or 1
     """
-    cm = compute_confusion_matrix(y_true, y_pred)
+    if y_scores is not None and len(y_scores) != len(y_true):
+        raise ValueError(f"y_true and y_scores differ in length: {len(y_true)} != {len(y_scores)}")
+    
+    if njit is not None:
+        # One compiled pass for the counts and the AUC rank sum instead of separate scans
+        yt = to_int8(y_true)
+        yp = to_int8(y_pred)
+        _check_labels(yt, yp)
+        scores = np.asarray(y_scores if y_scores is not None else (), dtype=np.float64)
+        constant = _constant_scores(scores)
+        # Constant scores need no rank sum, so the kernel skips its sort
+        tn, fp, fn, tp, rank_sum = _report_kernel(yt, yp, scores[:0] if constant else scores)
+        cm = {
+            'true_positive': int(tp),
+            'true_negative': int(tn),
+            'false_positive': int(fp),
+            'false_negative': int(fn),
+            'total': int(yt.size)
+        }
+    else:
+        cm = compute_confusion_matrix(y_true, y_pred)
+        constant = y_scores is not None and _constant_scores(y_scores)
     precision = compute_precision(cm)
     recall = compute_recall(cm)
     f1 = compute_f1_score(precision, recall)
@@ -216,7 +357,15 @@ def compute_classification_report(
     
     # Add ROC-AUC if scores provided
     if y_scores is not None:
-        report['roc_auc'] = compute_roc_auc(y_true, y_scores)
+        n_pos = cm['true_positive'] + cm['false_negative']
+        n_neg = cm['total'] - n_pos
+        if constant:
+            report['roc_auc'] = 0.5
+        else:
+            if njit is None:
+                # Skip the sort when only one class is present
+                rank_sum = _positive_rank_sum(y_true, y_scores) if n_pos and n_neg else 0.0
+            report['roc_auc'] = _auc_from_rank_sum(rank_sum, n_pos, n_neg)
     
     return report
 
@@ -284,8 +433,19 @@ def find_optimal_threshold(
     best_threshold = 50.0
     best_value = 0.0
     
+    # Labels and scores are extracted and coerced once for all 101 thresholds; ROC-AUC
+    # doesn't depend on the threshold and isn't optimized here, so it is left out
+    y_true = to_int8([item['label'] for item in ground_truth])
+    y_scores = [pred['purchase_probability'] for pred in predictions]
+    if np is not None:
+        y_scores = np.asarray(y_scores, dtype=np.float64)
+    
     for threshold in thresholds:
-        report = evaluate_with_threshold(ground_truth, predictions, threshold)
+        if np is not None:
+            y_pred = (y_scores >= threshold).astype(np.int8)
+        else:
+            y_pred = [1 if score >= threshold else 0 for score in y_scores]
+        report = compute_classification_report(y_true, y_pred)
         
         if metric == 'f1':
             value = report['f1_score']
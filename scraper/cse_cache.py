@@ -0,0 +1,38 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# CSE result pages by (query, start index), kept on disk so repeated searches across runs
+# cost no quota and no network (CSE_CACHE_TTL=0 disables). Dot-prefixed so writes don't
+# trigger Flask's reloader.
+CSE_CACHE_FILE = os.getenv('CSE_CACHE_FILE', 'data/.cse_cache.sqlite')
+CSE_CACHE_TTL = int(os.getenv('CSE_CACHE_TTL', str(12 * 3600)))
+_CSE_CACHE_LOCK = threading.Lock()
+_conn = None
+
+def _db() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CSE_CACHE_FILE) or '.', exist_ok=True)
+        _conn = sqlite3.connect(CSE_CACHE_FILE, check_same_thread=False, isolation_level=None)
+        _conn.execute('CREATE TABLE IF NOT EXISTS pages (q TEXT, start INTEGER, items TEXT, fetched REAL, PRIMARY KEY (q, start))')
+    return _conn
+
+def get_cached_page(q: str, start: int):
+    """Items of the page fetched for (q, start) within the TTL, else None"""
+    if CSE_CACHE_TTL <= 0:
+        return None
+    with _CSE_CACHE_LOCK:
+        row = _db().execute('SELECT items FROM pages WHERE q = ? AND start = ? AND fetched > ?',
+                            (q, start, time.time() - CSE_CACHE_TTL)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def cache_page(q: str, start: int, items: list) -> list:
+    """Remember a successfully fetched page (errors are not cached, so they are retried)"""
+    if CSE_CACHE_TTL > 0:
+        with _CSE_CACHE_LOCK:
+            _db().execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)',
+                          (q, start, json.dumps(items), time.time()))
+    return items
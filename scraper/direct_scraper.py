@@ -1,51 +1,695 @@
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from playwright.async_api import async_playwright
+from cachetools import TTLCache
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from lxml.cssselect import CSSSelector
+from urllib.parse import urljoin, unquote
+from lxml import etree
+import asyncio
+import atexit
+import functools
+import heapq
+import httpx
+import io
+import json
+import logging
+import multiprocessing
+import operator
+import os
 import re
+import lxml.html
+import tempfile
 import threading
 
-class DirectSearchScraper:
-    """Scrape directly from Amazon/Flipkart search pages (NO Google CSE!)"""
+try:
+    import ahocorasick  # pyahocorasick: one linear pass per title for every keyword
+except ImportError:
+    ahocorasick = None
+
+try:
+    import xxhash  # 64-bit keys for URLs without a product id, cheaper to hash and store than the string
+except ImportError:
+    xxhash = None
+
+log = logging.getLogger(__name__)
+
+# Recycle the shared browser context after this many pages to cap native memory drift
+BROWSER_POOL_RECYCLE_AFTER = int(os.getenv('BROWSER_POOL_RECYCLE_AFTER', '100'))
+
+# Headless scraping needs none of Chromium's GPU, sync, translate or background services
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-blink-features=AutomationControlled',  # Hide automation
+    '--disable-infobars',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--window-size=1920,1080',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-translate',
+    '--hide-scrollbars',
+    '--metrics-recording-only',
+    '--mute-audio',
+    '--no-first-run',
+    '--safebrowsing-disable-auto-update',
+    '--disable-ipc-flooding-protection',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-features=TranslateUI,BlinkGenPropertyTrees,IsolateOrigins,site-per-process',
+]
+if os.getenv('BROWSER_SINGLE_PROCESS', '0') == '1':
+    CHROMIUM_ARGS.append('--single-process')  # saves RAM on tiny workers, but one crash takes the browser down
+
+# Cookies/localStorage (incl. CAPTCHA clearance) carried over to the next context and run
+BROWSER_STATE_FILE = os.getenv('BROWSER_STATE_FILE', 'data/.browser_state.json')
+
+# Warm tabs kept open per thread between searches (one per concurrently scraped site is enough)
+BROWSER_PAGE_POOL_SIZE = int(os.getenv('BROWSER_PAGE_POOL_SIZE', '8'))
+
+# Worker processes for CPU-bound HTML parsing (0 = parse inline on the event loop)
+SCRAPER_PARSE_WORKERS = int(os.getenv('SCRAPER_PARSE_WORKERS', str(min(4, os.cpu_count() or 1))))
+_PARSE_POOL = None
+_PARSE_POOL_BROKEN = False  # workers could not start/import here; parse inline from then on
+_PARSE_POOL_LOCK = threading.Lock()
+
+def _parse_pool_context():
+    """Start workers from a clean process, never by forking this one.
     
-    def __init__(self):
-        self.playwright = None
-        self.browser = None
-        self.context = None
+    The pool is first used from a multi-threaded process (request threads, event loops
+    with live Playwright connections, log listener), and fork() would copy locks other
+    threads hold. The forkserver preloads nothing, so it stays single-threaded itself;
+    spawn is the fallback where there is no forkserver (Windows).
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload([])
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+def _get_parse_pool():
+    """Lazily start the shared parse pool (None when disabled)"""
+    global _PARSE_POOL
+    if SCRAPER_PARSE_WORKERS <= 0 or _PARSE_POOL_BROKEN:
+        return None
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is None:
+            _PARSE_POOL = ProcessPoolExecutor(max_workers=SCRAPER_PARSE_WORKERS, mp_context=_parse_pool_context())
+    return _PARSE_POOL
+
+def _drop_parse_pool(pool, error):
+    """Retire a pool whose workers died or could not import this module"""
+    global _PARSE_POOL, _PARSE_POOL_BROKEN
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is not pool:
+            return  # another caller already dropped it
+        _PARSE_POOL = None
+        _PARSE_POOL_BROKEN = True
+    log.warning("Parse pool unusable (%s: %s); parsing inline", type(error).__name__, error)
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _disable_playwright_stack_capture():
+    """Stop Playwright from walking the Python stack on every API call.
     
-    def search(self, query: str, budget: float, sources: list):
-        """Main search method matching ScraperProvider interface"""
-        all_results = []
+    The client records caller frames for each page.*/context.* call purely as
+    debug metadata; we never read it (errors are caught and printed), so it is
+    wasted CPU in a scraping loop. Opt in with PW_INSPECT_STACK=0.
+    """
+    try:
+        from playwright._impl import _connection
+    except ImportError:
+        return
+    
+    if hasattr(_connection, '_capture_stack_trace'):
+        # Newer clients walk frames in a helper
+        _connection._capture_stack_trace = lambda: {"frames": [], "apiName": "", "title": None}
+    else:
+        # Older clients call inspect.stack() directly
+        import inspect
+        import types
+        shim = types.SimpleNamespace(**vars(inspect))
+        shim.stack = lambda *args, **kwargs: []
+        _connection.inspect = shim
+
+if os.getenv('PW_INSPECT_STACK', '1') == '0':
+    _disable_playwright_stack_capture()
+
+@dataclass(slots=True, frozen=True)
+class Product:
+    """One scraped listing; converted to a plain dict only at the public API boundary"""
+    name: str
+    price: float
+    url: str
+    source: str
+    rating: float
+    reviews: int
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+def _to_dicts(products):
+    return [p.to_dict() for p in products]
+
+# Recent per-site results, keyed by (site, normalised query, count)
+_CACHE = TTLCache(maxsize=512, ttl=int(os.getenv('SCRAPER_CACHE_TTL', '300')))
+_CACHE_LOCK = threading.Lock()
+
+def _ttl_cached(site: str):
+    """Serve repeat lookups for `site` from _CACHE instead of re-scraping"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(self, query: str, count: int = 5):
+            key = (site, query.lower().strip(), count)
+            with _CACHE_LOCK:
+                cached = _CACHE.get(key)
+            if cached is not None:
+                return list(cached)
+            
+            results = await fn(self, query, count)
+            if results:  # empty usually means CAPTCHA/timeout - worth retrying next time
+                # Product is frozen, so the cache can hand out the same objects
+                with _CACHE_LOCK:
+                    _CACHE[key] = tuple(results)
+            return results
+        return wrapper
+    return decorator
+
+# The scrapers only read DOM text and hrefs, so pixels, fonts and trackers are dead weight
+BLOCKED_RESOURCE_TYPES = frozenset({'image', 'font', 'media', 'stylesheet'})
+BLOCKED_HOSTS = (
+    'doubleclick.net', 'google-analytics.com', 'googletagmanager.com', 'googlesyndication.com',
+    'criteo', 'scorecardresearch', 'fls-na.amazon', 'facebook.net', 'hotjar',
+)
+
+# Common junk keywords for tech products (dropped unless the query asks for them)
+_NEG_WORDS = ['case', 'cover', 'screen protector', 'guard', 'tempered glass', 'skin', 'sticker', 'stand', 'fan', 'mount']
+_NEG_COMBINED = re.compile(r'\b(' + '|'.join(map(re.escape, _NEG_WORDS)) + r')\b')
+
+# Synonyms a title must contain when the query names the category (phone <-> mobile)
+_CATEGORY_MAP = {
+    'laptop': frozenset(['laptop', 'notebook', 'macbook', 'chromebook',
+                         'victus', 'pavilion', 'omen', 'envy',  # HP models
+                         'loq', 'ideapad', 'legion', 'thinkpad',  # Lenovo models
+                         'tuf', 'rog', 'vivobook', 'zenbook',  # Asus models
+                         'inspiron', 'xps', 'alienware', 'latitude',  # Dell models
+                         'predator', 'aspire', 'swift',  # Acer models
+                         'cyborg', 'katana', 'stealth', 'raider']),  # MSI models
+    'mobile': frozenset(['mobile', 'phone', 'smartphone', 'android', 'iphone']),
+    'phone': frozenset(['mobile', 'phone', 'smartphone', 'android', 'iphone']),
+    'monitor': frozenset(['monitor', 'display', 'screen']),
+    'watch': frozenset(['watch']),
+    'tv': frozenset(['tv', 'television']),
+    'shoe': frozenset(['shoe', 'sneaker', 'boot', 'sandal']),
+}
+
+_PRICE_RE = re.compile(r'(\d+(?:\.\d+)?)')
+
+def _build_keyword_automaton():
+    """One automaton over accessory words and category synonyms: word -> (word, is_negative, categories)"""
+    kinds = {}
+    for word in _NEG_WORDS:
+        kinds.setdefault(word, [False, set()])[0] = True
+    for cat, synonyms in _CATEGORY_MAP.items():
+        for syn in synonyms:
+            kinds.setdefault(syn, [False, set()])[1].add(cat)
+    
+    automaton = ahocorasick.Automaton()
+    for word, (is_negative, cats) in kinds.items():
+        automaton.add_word(word, (word, is_negative, frozenset(cats)))
+    automaton.make_automaton()
+    return automaton
+
+_KEYWORD_AC = _build_keyword_automaton() if ahocorasick else None
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+def _scan_title(title: str):
+    """Return (accessory words hit on word boundaries, categories whose synonyms appear) for a lowercased title"""
+    if _KEYWORD_AC is None:
+        categories = {cat for cat, synonyms in _CATEGORY_MAP.items() if any(syn in title for syn in synonyms)}
+        return _NEG_COMBINED.findall(title), categories
+    
+    negatives, categories = [], set()
+    for end, (word, is_negative, cats) in _KEYWORD_AC.iter(title):
+        categories |= cats
+        if is_negative:
+            start = end - len(word) + 1
+            # Same word boundaries as _NEG_COMBINED's \b
+            if (start == 0 or not _is_word_char(title[start - 1])) and \
+               (end + 1 == len(title) or not _is_word_char(title[end + 1])):
+                negatives.append(word)
+    return negatives, categories
+
+async def _block_heavy_requests(route):
+    """Abort requests for resources that never affect the parsed DOM"""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in request.url for host in BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+# Plain-HTTP fast path for server-rendered SERPs (User-Agent is rotated per request)
+HTTP_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-IN,en;q=0.9,hi;q=0.8',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Server-rendered SERPs are parsed in Python; selectors are compiled once at import
+_AMZ_CARDS = CSSSelector("div.s-main-slot div[data-component-type='s-search-result']")
+_AMZ_LINK = CSSSelector("a.a-link-normal.s-no-outline")
+_AMZ_TITLE = CSSSelector("h2 span")
+_AMZ_RATING = CSSSelector("span[aria-label*='out of 5 stars']")
+_AMZ_PRICE = CSSSelector("span.a-price-whole")
+
+_FK_CARDS = CSSSelector('div[data-id], div.cPHDOP, div._1AtVbE, div.slAVV4, div._75nlfW')
+_FK_LINK = CSSSelector('a[href*="/p/"], a.VJA3rP, a.CGtC98, a._1fQZEK, a.s1Q9rs')
+_FK_TITLE = CSSSelector('div.KzDlHZ, a.wjcEIp, div._4rR01T, .s1Q9rs')
+_FK_PRICE = CSSSelector('div.Nx9bqj, div._30jeq3, div.hl05eU, div._1_WHN1')
+_FK_PRICE_FALLBACK_RE = re.compile(r'([₹]|Rs\.?|INR)\s?([\d,]+)', re.IGNORECASE)
+_NON_DIGIT_RE = re.compile(r'[^\d]')
+
+# Amazon names a product by its 10-char ASIN and Flipkart by its pid, whatever tracking
+# path or query the link carries; an ASIN is packed into one int (base 36)
+_ASIN_RE = re.compile(r'/(?:dp|gp/product)/([A-Z0-9]{10})')
+_FK_PID_RE = re.compile(r'[?&]pid=([A-Z0-9]+)')
+
+def _product_key(url: str):
+    """Dedup key for a product URL: its ASIN or Flipkart pid, else a hash of the URL (or the URL itself)"""
+    m = _ASIN_RE.search(url)
+    if m:
+        return int(m.group(1), 36)
+    m = _FK_PID_RE.search(url)
+    if m:
+        return m.group(1)
+    return xxhash.xxh3_64_intdigest(url.encode()) if xxhash is not None else url
+
+def _parse_price(text: str) -> float:
+    text = text.replace('₹', '').replace(',', '').replace('Rs', '').strip()
+    match = _PRICE_RE.search(text)
+    return float(match.group(1)) if match else 0.0
+
+def _parse_amazon_html(html: str, count: int):
+    """Extract up to `count` priced products from an Amazon search page"""
+    doc = lxml.html.fromstring(html)
+    results = []
+    seen = set()
+    
+    for card in _AMZ_CARDS(doc):
+        if len(results) >= count:
+            break
+        
+        # Get link
+        links = _AMZ_LINK(card)
+        if not links: continue
+        
+        raw_href = links[0].get("href") or ""
+        link = "https://www.amazon.in" + raw_href if raw_href.startswith("/") else raw_href
+            
+        key = _product_key(link)
+        if key in seen: continue
+        seen.add(key)
+        
+        # Get title/rating
+        title_elems = _AMZ_TITLE(card)
+        title = title_elems[0].text_content().strip() if title_elems else "Unknown Product"
+        
+        rating = 4.0
+        try:
+            rating_elems = _AMZ_RATING(card)
+            if rating_elems: rating = float(rating_elems[0].get("aria-label").split()[0])
+        except: pass
+
+        # Get Price
+        whole = _AMZ_PRICE(card)
+        if whole:
+            price = _parse_price(whole[0].text_content().strip())
+            if price > 0:
+                results.append(Product(
+                    name=title[:100],
+                    price=price,
+                    url=link,
+                    source='amazon',
+                    rating=rating,
+                    reviews=100
+                ))
+    return results
+
+def _parse_flipkart_html(html: str, base_url: str = 'https://www.flipkart.com'):
+    """Extract up to 8 products from a Flipkart search page"""
+    doc = lxml.html.fromstring(html)
+    items = []
+    seen = set()
+    
+    for card in _FK_CARDS(doc):
+        if len(items) >= 8:
+            break
+        
+        # LINK
+        links = _FK_LINK(card)
+        if not links: continue
+        link_el = links[0]
         
-        # Electronics sources
-        if not sources or 'amazon' in sources:
-            amazon_results = self.search_amazon(query, count=5)
-            all_results.extend(amazon_results)
+        # A product can match more than one of the card selectors
+        key = _product_key(link_el.get('href') or '')
+        if key in seen: continue
+        seen.add(key)
         
-        if not sources or 'flipkart' in sources:
-            flipkart_results = self.search_flipkart(query, count=5)
-            all_results.extend(flipkart_results)
+        # TITLE
+        title_els = _FK_TITLE(card)
+        if title_els: title = title_els[0].text_content()
+        elif link_el.get('title'): title = link_el.get('title')
+        else: title = link_el.text_content()
         
-        # Clothing/Fashion sources
-        if not sources or 'myntra' in sources:
-            myntra_results = self.search_myntra(query, count=5)
-            all_results.extend(myntra_results)
+        # PRICE
+        price = 0.0
+        price_els = _FK_PRICE(card)
+        if price_els:
+            clean = _NON_DIGIT_RE.sub('', price_els[0].text_content())
+            if clean: price = float(clean)
+        else:
+            # Regex fallback
+            m = _FK_PRICE_FALLBACK_RE.search(card.text_content())
+            if m:
+                price = float(m.group(2).replace(',', '') or 0)
         
-        if not sources or 'ajio' in sources:
-            ajio_results = self.search_ajio(query, count=5)
-            all_results.extend(ajio_results)
+        if price > 100: # Filter out garbage low prices
+            items.append(Product(
+                name=title.strip(),
+                price=price,
+                url=urljoin(base_url, link_el.get('href')),
+                source='flipkart',
+                rating=4.2, # Mock rating if missing
+                reviews=50
+            ))
+    return items
+
+_GS_CARD_CLASSES = ('sh-dgr__gr-auto', 'sh-dlr__content', 'sh-dgr__content')
+_GS_WAIT_SELECTOR = '.sh-dgr__gr-auto, div[data-docid], .sh-dlr__content, .sh-dgr__content, #captcha-form'
+_GS_LINK = CSSSelector('a[href*="/shopping/product"], a[href*="/url?"]')
+_GS_TITLE = CSSSelector('h3, h4, .tAxDx, [role="heading"]')
+_GS_PRICE = CSSSelector('.a8Pemb, span[aria-label*="₹"], span[aria-label*="$"], [data-sh-pr]')
+_GS_PRICE_ATTR = CSSSelector('[data-sh-pr], [data-price]')
+_GS_RATING = CSSSelector('[aria-label*="star"], .Rsc7Yb')
+_GS_SELLER = CSSSelector('.aULzUe, .IuHnof, [data-merchant-name]')
+_GS_PRICE_RE = re.compile(r'[₹$]?\s*([0-9,]+)(\.[0-9]{2})?')
+_RATING_RE = re.compile(r'([0-9.]+)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Checked in order; first domain found in the URL names the source
+_URL_SOURCES = (
+    ('amazon.in', 'amazon'), ('amazon.com', 'amazon'), ('flipkart.com', 'flipkart'),
+    ('myntra.com', 'myntra'), ('ajio.com', 'ajio'), ('croma.com', 'croma'),
+    ('reliancedigital.in', 'reliance'),
+)
+
+def _text(elem) -> str:
+    """innerText-ish for plain etree elements (iterparse yields no lxml.html helpers)"""
+    return ''.join(elem.itertext())
+
+def _is_google_card(elem) -> bool:
+    if elem.get('data-docid') is not None:
+        return True
+    classes = (elem.get('class') or '').split()
+    return any(c in classes for c in _GS_CARD_CLASSES)
+
+def _google_card_to_item(card):
+    """Port of the old in-browser extractor for one Google Shopping card; None if invalid"""
+    links = _GS_LINK(card)
+    if not links:
+        return None
+    
+    url = urljoin('https://www.google.com', links[0].get('href'))
+    
+    # Decode Google redirect URLs
+    if '/url?url=' in url:
+        url = unquote(url.split('url=')[1].split('&')[0])
+    elif '/url?q=' in url:
+        url = unquote(url.split('q=')[1].split('&')[0])
+    
+    # Extract title
+    title_els = _GS_TITLE(card)
+    title = _text(title_els[0]).strip() if title_els else 'Unknown Product'
+    
+    # Extract price (multiple strategies)
+    price = 0
+    price_els = _GS_PRICE(card)
+    if price_els:
+        price_text = _text(price_els[0]) or price_els[0].get('aria-label') or ''
+        m = _GS_PRICE_RE.search(price_text)
+        if m and m.group(1).replace(',', ''):
+            price = int(m.group(1).replace(',', ''))
+    
+    # If no price found, try data attributes
+    if price == 0:
+        attr_els = _GS_PRICE_ATTR(card)
+        if attr_els:
+            value = _NON_DIGIT_RE.sub('', attr_els[0].get('data-sh-pr') or attr_els[0].get('data-price') or '')
+            if value:
+                price = int(value)
+    
+    # Extract rating (if available)
+    rating = 4.0
+    rating_els = _GS_RATING(card)
+    if rating_els:
+        m = _RATING_RE.search(rating_els[0].get('aria-label') or _text(rating_els[0]))
+        if m:
+            try: rating = float(m.group(1))
+            except ValueError: pass
+    
+    # Detect source from URL or seller name
+    source = next((name for domain, name in _URL_SOURCES if domain in url), None)
+    if source is None:
+        source = 'unknown'
+        seller_els = _GS_SELLER(card)
+        if seller_els:
+            seller = _text(seller_els[0]).lower()
+            if 'amazon' in seller: source = 'amazon'
+            elif 'flipkart' in seller: source = 'flipkart'
+            elif 'myntra' in seller: source = 'myntra'
+            else: source = _WHITESPACE_RE.sub('_', seller)
+    
+    # Only add valid products
+    if price > 0 and title != 'Unknown Product' and url.startswith('http'):
+        return Product(
+            name=title,
+            price=price,
+            url=url,
+            source=source,
+            rating=rating,
+            reviews=100
+        )
+    return None
+
+def _parse_google_shopping_html(html: str, limit: int = 20):
+    """Stream Google Shopping cards out of the page, stopping once `limit` are found.
+    
+    iterparse hands us each card as soon as its closing tag is seen; processed
+    cards (and everything before them) are freed, so the full multi-MB DOM is
+    never held in memory and we stop reading after `limit` products.
+    
+    Card selectors also match the content div inside a grid card; only the
+    outermost match is a card, and nothing inside it is freed before it ends.
+    """
+    items = []
+    seen = set()
+    depth = 0  # open card elements around the current position
+    parser = etree.iterparse(io.BytesIO(html.encode('utf-8')), events=('start', 'end'), tag='div', html=True, recover=True)
+    for event, elem in parser:
+        if not _is_google_card(elem):
+            continue
+        if event == 'start':
+            depth += 1
+            continue
+        depth -= 1
+        if depth:
+            continue  # nested in an enclosing card, parsed with it
+        
+        item = _google_card_to_item(elem)
+        if item and item.url not in seen:
+            seen.add(item.url)
+            items.append(item)
+        
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+        
+        if len(items) >= limit:
+            break
+    return items
+
+@dataclass(frozen=True)
+class SiteConfig:
+    """Everything that differs between the fashion sites scraped from their search grid"""
+    name: str
+    label: str
+    url_template: str           # '{q}' is replaced by the query joined with query_sep
+    query_sep: str
+    wait_selector: str
+    card_selector: str
+    title_selector: str
+    price_selector: str
+    rating_selector: str = None  # None -> always default_rating
+    default_rating: float = 4.0
+    default_reviews: int = 100
+    goto_timeout_ms: int = 30000
+    wait_timeout_ms: int = 8000
+    server_rendered: bool = False  # cards are in the first response -> try plain HTTP before the browser
+
+_SITES = {cfg.name: cfg for cfg in (
+    SiteConfig('myntra', 'Myntra', 'https://www.myntra.com/{q}', '-',
+               wait_selector='li.product-base',
+               card_selector='li.product-base, ul.results-base li',
+               title_selector='h3, h4, .product-product',
+               price_selector='.product-price, .product-discountedPrice',
+               rating_selector='.product-rating',
+               goto_timeout_ms=45000),
+    SiteConfig('ajio', 'Ajio', 'https://www.ajio.com/search/?text={q}', '%20',
+               wait_selector='.rilrtl-products-list__item',
+               card_selector='.item, .rilrtl-products-list__item',
+               title_selector='.nameCls, .name',
+               price_selector='.price, .price-value',
+               default_rating=4.1, default_reviews=80,
+               goto_timeout_ms=45000),
+    SiteConfig('shein', 'Shein', 'https://www.sheinindia.in/search/{q}', '-',
+               wait_selector='.product-card, .S-product-item',
+               card_selector='.product-card, .S-product-item, [class*="product"]',
+               title_selector='.product-card__title, .goods-title, h3',
+               price_selector='.product-card__price, .price-section',
+               rating_selector='.she-rate-star, .product-card__rating',
+               default_rating=4.2, default_reviews=150,
+               goto_timeout_ms=60000, wait_timeout_ms=10000),  # React render
+    SiteConfig('savana', 'Savana', 'https://www.savana.in/search?q={q}', '+',
+               wait_selector='.product-item, .product-card',
+               card_selector='.product-item, .product-card, [class*="product"]',
+               title_selector='.product-title, h3, h4',
+               price_selector='.price, .product-price',
+               default_reviews=60, server_rendered=True),
+)}
+
+# One extractor for every SiteConfig; selectors arrive as the evaluate() argument
+_SITE_EXTRACT_JS = """(cfg) => {
+    const items = [];
+    document.querySelectorAll(cfg.card).forEach(card => {
+        if (items.length >= 8) return;
+        
+        const linkEl = card.querySelector('a');
+        if (!linkEl) return;
+        
+        const title = card.querySelector(cfg.title)?.innerText || 'Unknown';
+        const priceText = card.querySelector(cfg.price)?.innerText || '0';
+        const price = parseInt(priceText.replace(/[^0-9]/g, '')) || 0;
+        const ratingText = cfg.rating ? card.querySelector(cfg.rating)?.innerText : null;
+        const rating = parseFloat(ratingText) || cfg.defaultRating;
+        
+        items.push({
+            name: title,
+            price: price,
+            url: linkEl.href,
+            source: cfg.name,
+            rating: rating,
+            reviews: cfg.defaultReviews
+        });
+    });
+    return items;
+}"""
+
+_css = functools.lru_cache(maxsize=None)(CSSSelector)
+_LEADING_FLOAT_RE = re.compile(r'\s*([+-]?(?:\d+\.?\d*|\.\d+))')
+
+def _parse_site_html(cfg: SiteConfig, html: str, base_url: str):
+    """Python twin of _SITE_EXTRACT_JS for pages fetched without a browser"""
+    doc = lxml.html.fromstring(html)
+    items = []
+    
+    for card in _css(cfg.card_selector)(doc):
+        if len(items) >= 8:
+            break
+        
+        links = _css('a')(card)
+        if not links or not links[0].get('href'): continue
+        
+        title_els = _css(cfg.title_selector)(card)
+        title = title_els[0].text_content().strip() if title_els else ''
+        price_els = _css(cfg.price_selector)(card)
+        price_digits = _NON_DIGIT_RE.sub('', price_els[0].text_content()) if price_els else ''
+        rating = cfg.default_rating
+        if cfg.rating_selector:
+            rating_els = _css(cfg.rating_selector)(card)
+            m = _LEADING_FLOAT_RE.match(rating_els[0].text_content()) if rating_els else None
+            if m and float(m.group(1)):
+                rating = float(m.group(1))
+        
+        items.append(Product(
+            name=title or 'Unknown',
+            price=int(price_digits) if price_digits else 0,
+            url=urljoin(base_url, links[0].get('href')),
+            source=cfg.name,
+            rating=rating,
+            reviews=cfg.default_reviews
+        ))
+    return items
+
+class DirectSearchScraper:
+    """Scrape directly from Amazon/Flipkart search pages (NO Google CSE!)"""
+    
+    def search(self, query: str, budget: float, sources: list):
+        """Main search method matching ScraperProvider interface"""
+        return _to_dicts(self._run(self._search_async(query, budget, sources)))
+    
+    async def _search_async(self, query: str, budget: float, sources: list):
+        """Fan out to every requested source concurrently (latency = slowest site, not the sum)"""
+        # Electronics sources first, then Clothing/Fashion sources
+        tasks = [
+            getattr(self, f'_search_{name}')(query, count=5)
+            for name in ('amazon', 'flipkart', *_SITES)
+            if not sources or name in sources
+        ]
         
-        if not sources or 'shein' in sources:
-            shein_results = self.search_shein(query, count=5)
-            all_results.extend(shein_results)
+        all_results = []
+        for site_results in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(site_results, Exception):
+                print(f"⚠️ Source failed: {site_results}")
+                continue
+            all_results.extend(site_results)
         
-        if not sources or 'savana' in sources:
-            savana_results = self.search_savana(query, count=5)
-            all_results.extend(savana_results)
+        # The same product can surface from several sources; keep its first listing
+        seen = set()
+        unique = []
+        for r in all_results:
+            key = _product_key(r.url)
+            if key not in seen:
+                seen.add(key)
+                unique.append(r)
         
-        # Sort by price and limit to 12
-        all_results.sort(key=lambda x: x['price'])
-        return all_results[:12]
+        # Cheapest 12 (partial sort)
+        return heapq.nsmallest(12, unique, key=operator.attrgetter('price'))
+    
+    def search_all(self, query: str, sources=('amazon', 'flipkart'), count: int = 5):
+        """Search several sites at once; {source: [product dicts]}, [] for a source that failed"""
+        return self._run(self._search_all(query, sources, count))
     
-    # Thread-local persistence
+    async def _search_all(self, query: str, sources, count: int):
+        """Per-site results, fetched concurrently on this thread's loop (unmerged, unsorted)"""
+        site_results = await asyncio.gather(
+            *(getattr(self, f'_search_{name}')(query, count=count) for name in sources),
+            return_exceptions=True
+        )
+        by_source = {}
+        for name, results in zip(sources, site_results):
+            if isinstance(results, Exception):
+                print(f"⚠️ Source failed: {results}")
+                results = []
+            by_source[name] = _to_dicts(results)
+        return by_source
+    
+    # Thread-local persistence. One instance serves every request thread, so browser
+    # objects (bound to the launching thread's loop) are kept here, never on self
     _thread_local = threading.local()
 
     # Realistic user agents pool (Rotate to avoid fingerprinting)
@@ -57,40 +701,64 @@ class DirectSearchScraper:
         'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15',
     ]
 
-    def _ensure_browser(self):
-        """Initialize browser for the current thread with STEALTH anti-detection"""
-        import random
+    def _run(self, coro):
+        """Drive a coroutine to completion on this thread's persistent event loop.
         
-        if not hasattr(DirectSearchScraper._thread_local, 'playwright'):
-            print(f"🚀 Launching Stealth Browser (Thread {threading.get_ident()})...")
-            p = sync_playwright().start()
+        Async Playwright objects are bound to the loop that created them, so the
+        loop lives in _thread_local next to the browser (asyncio.run() would
+        close it after every call and orphan the browser).
+        """
+        if not hasattr(DirectSearchScraper._thread_local, 'loop'):
+            DirectSearchScraper._thread_local.loop = asyncio.new_event_loop()
+            DirectSearchScraper._thread_local.launch_lock = asyncio.Lock()
+        loop = DirectSearchScraper._thread_local.loop
+        
+        # Nothing is in flight between calls, so this is the safe point to recycle
+        if getattr(DirectSearchScraper._thread_local, 'pages_served', 0) >= BROWSER_POOL_RECYCLE_AFTER:
+            loop.run_until_complete(self._recycle_context())
+        return loop.run_until_complete(coro)
+
+    async def _ensure_browser(self):
+        """Initialize browser and shared context for the current thread with STEALTH anti-detection"""
+        # Concurrent site coroutines all land here first; only one may launch
+        async with DirectSearchScraper._thread_local.launch_lock:
+            if not hasattr(DirectSearchScraper._thread_local, 'playwright'):
+                print(f"🚀 Launching Stealth Browser (Thread {threading.get_ident()})...")
+                p = await async_playwright().start()
+                
+                # STEALTH: Launch with anti-detection args
+                b = await p.chromium.launch(
+                    headless=True,
+                    args=CHROMIUM_ARGS,
+                )
+                DirectSearchScraper._thread_local.playwright = p
+                DirectSearchScraper._thread_local.browser = b
+                if threading.current_thread() is threading.main_thread():
+                    atexit.register(self.close)  # worker threads save on recycle/close instead
             
-            # STEALTH: Launch with anti-detection args
-            b = p.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-blink-features=AutomationControlled',  # Hide automation
-                    '--disable-infobars',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--window-size=1920,1080',
-                ]
-            )
-            DirectSearchScraper._thread_local.playwright = p
-            DirectSearchScraper._thread_local.browser = b
+            # One context per thread; every site just opens a page in it
+            if getattr(DirectSearchScraper._thread_local, 'context', None) is None:
+                state = BROWSER_STATE_FILE if os.path.exists(BROWSER_STATE_FILE) else None
+                DirectSearchScraper._thread_local.context = await self._new_context(
+                    DirectSearchScraper._thread_local.browser, storage_state=state
+                )
+                DirectSearchScraper._thread_local.pages_served = 0
         
-        self.playwright = DirectSearchScraper._thread_local.playwright
-        self.browser = DirectSearchScraper._thread_local.browser
+        DirectSearchScraper._thread_local.pages_served += 1
+        return DirectSearchScraper._thread_local.context
+
+    async def _new_context(self, browser, storage_state=None):
+        """Create a stealth context (rotated user agent) on `browser` (this thread's)"""
+        import random
         
         # STEALTH: Rotate user agent and set realistic context
         ua = random.choice(self.USER_AGENTS)
-        self.context = self.browser.new_context(
+        context = await browser.new_context(
             user_agent=ua,
             viewport={'width': 1920, 'height': 1080},
             locale='en-IN',
             timezone_id='Asia/Kolkata',
+            storage_state=storage_state,
             # Stealth extras
             java_script_enabled=True,
             bypass_csp=True,
@@ -105,7 +773,7 @@ class DirectSearchScraper:
         )
         
         # STEALTH: Inject anti-detection JavaScript into every new page
-        self.context.add_init_script("""
+        await context.add_init_script("""
             // Override navigator.webdriver (key detection flag)
             Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
             
@@ -120,544 +788,338 @@ class DirectSearchScraper:
                 window.chrome.runtime = {};
             }
         """)
+        await context.route("**/*", _block_heavy_requests)
+        return context
+
+    async def _recycle_context(self):
+        """Drop the thread's shared context; _ensure_browser lazily creates a fresh one"""
+        old = getattr(DirectSearchScraper._thread_local, 'context', None)
+        DirectSearchScraper._thread_local.context = None
+        DirectSearchScraper._thread_local.idle_pages = []  # closed along with their context
+        DirectSearchScraper._thread_local.pages_served = 0
+        if old is not None:
+            await self._save_storage_state(old)
+            try:
+                await old.close()
+            except Exception:
+                pass
+    
+    async def _save_storage_state(self, context):
+        """Persist the context's cookies so the next context starts as a returning visitor"""
+        try:
+            state = await context.storage_state()
+            state_dir = os.path.dirname(BROWSER_STATE_FILE) or '.'
+            os.makedirs(state_dir, exist_ok=True)
+            # Unique per writer: threads and gunicorn worker processes may save concurrently
+            # (dot-prefixed, like the state file, so Flask's reloader ignores it)
+            fd, tmp = tempfile.mkstemp(dir=state_dir, prefix='.browser_state.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(tmp, BROWSER_STATE_FILE)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except Exception as e:
+            print(f"⚠️ Could not save browser state: {e}")
+    
+    async def _acquire_page(self, context):
+        """Reuse a warm tab from this thread's pool (one per gathered site task), else open one"""
+        idle = getattr(DirectSearchScraper._thread_local, 'idle_pages', None) or []
+        while idle:
+            page = idle.pop()
+            if not page.is_closed():
+                return page
+        return await context.new_page()
+    
+    async def _release_page(self, page):
+        """Park a healthy shared-context tab for the next search; anything else is closed"""
+        tl = DirectSearchScraper._thread_local
+        if page.is_closed():
+            return
+        if page.context is not getattr(tl, 'context', None):
+            await page.close()  # throwaway CAPTCHA-retry context, or recycled since acquired
+            return
+        if not hasattr(tl, 'idle_pages'):
+            tl.idle_pages = []
+        if len(tl.idle_pages) >= BROWSER_PAGE_POOL_SIZE:
+            await page.close()
+        else:
+            tl.idle_pages.append(page)
+    
+    async def _parse_off_loop(self, parse, *args):
+        """Run a CPU-bound HTML parse in the worker pool so other sites' I/O keeps flowing"""
+        pool = _get_parse_pool()
+        if pool is None:
+            return parse(*args)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, parse, *args)
+        except (BrokenProcessPool, ImportError) as e:
+            # Forkserver workers re-import this module from their own sys.path/cwd, which
+            # can fail under gunicorn; degrade to inline parsing rather than lose the source
+            _drop_parse_pool(pool, e)
+            return parse(*args)
+    
+    async def _wait_for_results(self, page, selector: str, timeout: int = 8000):
+        """Wait until product cards are in the DOM instead of sleeping a fixed interval"""
+        try:
+            await page.wait_for_selector(selector, state='attached', timeout=timeout)
+        except Exception:
+            # No cards (empty SERP / layout change) - parse whatever has loaded
+            await page.wait_for_load_state('domcontentloaded')
+    
+    async def _has_results(self, page, selector: str) -> bool:
+        """Cheap in-page count so CAPTCHA/empty pages skip the content() transfer and parse"""
+        return await page.locator(selector).count() > 0
+    
+    def _http_client(self):
+        """This thread's pooled HTTP client (loop-bound, like the browser, so it lives in _thread_local)"""
+        tl = DirectSearchScraper._thread_local
+        if getattr(tl, 'http', None) is None:
+            tl.http = httpx.AsyncClient(
+                http2=True, headers=HTTP_HEADERS, follow_redirects=True,
+                # Searches arrive seconds to minutes apart; httpx's default 5s idle expiry
+                # would drop the Amazon/Flipkart connections (and their TLS sessions) in between
+                limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=30.0),
+                timeout=httpx.Timeout(10.0, connect=5.0)
+            )
+        return tl.http
+    
+    async def _fetch_html(self, url: str):
+        """GET a server-rendered page without a browser; None if blocked or failed (caller falls back)"""
+        import random
+        
+        try:
+            r = await self._http_client().get(url, headers={'User-Agent': random.choice(self.USER_AGENTS)})
+        except httpx.HTTPError as e:
+            print(f"   ⚠️ HTTP fetch failed ({type(e).__name__}), using browser: {url[:60]}")
+            return None
+        
+        html = r.text
+        if r.status_code != 200 or "Enter the characters you see below" in html or "captcha" in html.lower():
+            return None
+        return html
     
     def search_amazon(self, query: str, count: int = 5):
         """Search Amazon directly and get products with prices"""
+        return _to_dicts(self._run(self._search_amazon(query, count)))
+
+    @_ttl_cached('amazon')
+    async def _search_amazon(self, query: str, count: int = 5):
         import random
-        import time
         
-        self._ensure_browser()
+        search_url = f"https://www.amazon.in/s?k={query.replace(' ', '+')}"
+        
+        # Fast path: the SERP is server-rendered, so one GET usually has every card
+        html = await self._fetch_html(search_url)
+        if html:
+            results = await self._parse_off_loop(_parse_amazon_html, html, count)
+            if results:
+                return self._filter_results(results, query)
+        
+        context = await self._ensure_browser()
         
         # STEALTH: Random delay to simulate human behavior (0.5 - 2 seconds)
-        time.sleep(random.uniform(0.5, 2.0))
+        await asyncio.sleep(random.uniform(0.5, 2.0))
         
-        search_url = f"https://www.amazon.in/s?k={query.replace(' ', '+')}"
-        page = self.context.new_page()
+        page = await self._acquire_page(context)
+        retry_context = None
         
         try:
-            page.goto(search_url, timeout=30000)
+            await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
             
             # AMAZON CAPTCHA DETECTION
-            if "Enter the characters you see below" in page.content() or "captcha" in page.content().lower():
+            html = await page.content()
+            if "Enter the characters you see below" in html or "captcha" in html.lower():
                 print("⚠️ AMAZON CAPTCHA DETECTED!")
                 print("   💡 TIP: The stealth mode is active but Amazon still blocked.")
                 print("   🔄 Retrying with fresh browser context...")
-                page.close()
+                await page.close()
                 
-                # Force new context with different user agent
-                self.context.close()
-                self._ensure_browser()
-                page = self.context.new_page()
-                time.sleep(random.uniform(1, 3))
-                page.goto(search_url, timeout=30000)
+                # Throwaway context with a different user agent (the shared one may be serving other sites)
+                retry_context = await self._new_context(DirectSearchScraper._thread_local.browser)
+                page = await retry_context.new_page()
+                await asyncio.sleep(random.uniform(1, 3))
+                await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
                 
                 # Check again
-                if "captcha" in page.content().lower():
+                if "captcha" in (await page.content()).lower():
                     print("   ❌ CAPTCHA persists. Skipping Amazon for now.")
-                    page.close()
+                    await page.close()
                     return []
                 else:
                     print("   ✅ Retry successful!")
+                    await self._save_storage_state(retry_context)
             
-            page.wait_for_timeout(2000) # Fast wait
+            await self._wait_for_results(page, "div.s-main-slot div[data-component-type='s-search-result'] span.a-price-whole")
+            if not await self._has_results(page, "div[data-component-type='s-search-result']"):
+                print("   ⚠️ Amazon: no result cards (blocked or empty SERP)")
+                await self._release_page(page)
+                return []
             
-            soup = BeautifulSoup(page.content(), 'html.parser')
-            cards = soup.select("div.s-main-slot div[data-component-type='s-search-result']")
-            
-            results = []
-            seen = set()
-            
-            for card in cards:
-                if len(results) >= count:
-                    break
-                
-                # Get link
-                a = card.select_one("a.a-link-normal.s-no-outline")
-                if not a: continue
-                
-                raw_href = a.get("href")
-                link = "https://www.amazon.in" + raw_href if raw_href.startswith("/") else raw_href
-                    
-                if link in seen: continue
-                seen.add(link)
-                
-                # Get title/rating
-                title_elem = card.select_one("h2 span")
-                title = title_elem.get_text(strip=True) if title_elem else "Unknown Product"
-                
-                rating = 4.0
-                try:
-                    rating_elem = card.select_one("span[aria-label*='out of 5 stars']")
-                    if rating_elem: rating = float(rating_elem.get("aria-label").split()[0])
-                except: pass
-
-                # Get Price
-                whole = card.select_one("span.a-price-whole")
-                if whole:
-                    price = self._parse_price(whole.get_text(strip=True))
-                    if price > 0:
-                        results.append({
-                            'name': title[:100],
-                            'price': price,
-                            'url': link,
-                            'source': 'amazon',
-                            'rating': rating,
-                            'reviews': 100
-                        })
+            results = await self._parse_off_loop(_parse_amazon_html, await page.content(), count)
             
-            page.close()
+            await self._release_page(page)
             return self._filter_results(results, query)
         except Exception as e:
             print(f"Amazon Error: {e}")
-            page.close()
+            await page.close()
             return []
+        finally:
+            if retry_context:
+                await retry_context.close()
 
     def search_flipkart(self, query: str, count: int = 5):
         """Search Flipkart directly"""
-        self._ensure_browser()
+        return _to_dicts(self._run(self._search_flipkart(query, count)))
+
+    @_ttl_cached('flipkart')
+    async def _search_flipkart(self, query: str, count: int = 5):
         search_url = f"https://www.flipkart.com/search?q={query.replace(' ', '%20')}"
-        page = self.context.new_page()
+        
+        html = await self._fetch_html(search_url)
+        if html:
+            results = await self._parse_off_loop(_parse_flipkart_html, html)
+            if results:
+                return self._filter_results(results, query)
+        
+        context = await self._ensure_browser()
+        page = await self._acquire_page(context)
         try:
-            print(f"DEBUG: Visiting {search_url}")
-            page.goto(search_url, timeout=30000)
-            page.wait_for_timeout(3000)
+            log.debug("Visiting %s", search_url)
+            await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
+            await self._wait_for_results(page, 'div[data-id] a[href*="/p/"]')
+            
+            if not await self._has_results(page, 'a[href*="/p/"]'):
+                print("   ⚠️ Flipkart: no product links (blocked or empty SERP)")
+                await self._release_page(page)
+                return []
             
             # Dismiss generic popups
-            try: page.keyboard.press("Escape")
+            try: await page.keyboard.press("Escape")
             except: pass
 
-            # JAVA SCRIPT INJECTION (The Nuclear Option)
-            # Run extraction logic INSIDE the browser
-            results = page.evaluate("""() => {
-                const items = [];
-                const cards = document.querySelectorAll('div[data-id], div.cPHDOP, div._1AtVbE, div.slAVV4, div._75nlfW');
-                
-                cards.forEach(card => {
-                    if (items.length >= 8) return;
-
-                    // LINK
-                    const linkEl = card.querySelector('a[href*="/p/"], a.VJA3rP, a.CGtC98, a._1fQZEK, a.s1Q9rs');
-                    if (!linkEl) return;
-                    
-                    // TITLE
-                    let title = "Unknown";
-                    const titleEl = card.querySelector('div.KzDlHZ, a.wjcEIp, div._4rR01T, .s1Q9rs');
-                    if (titleEl) title = titleEl.innerText;
-                    else if (linkEl.title) title = linkEl.title;
-                    else title = linkEl.innerText;
-
-                    // PRICE
-                    let price = 0;
-                    const priceEl = card.querySelector('div.Nx9bqj, div._30jeq3, div.hl05eU, div._1_WHN1');
-                    if (priceEl) {
-                        const txt = priceEl.innerText;
-                        const clean = txt.replace(/[^\d]/g, '');
-                        if (clean) price = parseFloat(clean);
-                    } else {
-                        // Regex fallback
-                        const txt = card.innerText;
-                        const m = txt.match(/([₹]|Rs\.?|INR)\s?([\d,]+)/i);
-                        if (m) {
-                            price = parseFloat(m[2].replace(/,/g, ''));
-                        }
-                    }
-
-                    if (price > 100) { // Filter out garbage low prices
-                        items.push({
-                            name: title.trim(),
-                            price: price,
-                            url: linkEl.href,
-                            source: 'flipkart',
-                            rating: 4.2, // Mock rating if missing
-                            reviews: 50
-                        });
-                    }
-                });
-                return items;
-            }""")
+            # Server-rendered: one content() read, parsed in Python (no JS round-trip)
+            results = await self._parse_off_loop(_parse_flipkart_html, await page.content())
             
-            print(f"DEBUG: JS Extracted {len(results)} products")
-            page.close()
+            log.debug("Extracted %d products", len(results))
+            await self._release_page(page)
             return self._filter_results(results, query)
         except Exception as e:
-            print(f"Flipkart JS Error: {e}")
-            page.close()
+            print(f"Flipkart Error: {e}")
+            await page.close()
             return []
     
-    def search_google_shopping(self, query: str, max_results: int = 12):
-        """Scrape Google Shopping for global results"""
-        self._ensure_browser()
-        search_url = f"https://www.google.com/search?q={query.replace(' ', '+')}&tbm=shop"
-        
-        page = self.context.new_page()
-        try:
-            print(f"🌍 Searching Google Shopping (Global): {query}")
-            print(f"   URL: {search_url}")
-            page.goto(search_url, timeout=30000)
-            page.wait_for_timeout(3000)
-            
-            # Dismiss consent popup if present
-            try:
-                page.click('button:has-text("Accept all")', timeout=2000)
-            except:
-                pass
-            
-            # Debug: Check if page loaded
-            title = page.title()
-            print(f"   Page title: {title}")
-            
-            # Debug: Get page HTML sample
-            html_sample = page.content()[:500]
-            print(f"   HTML sample: {html_sample[:200]}...")
-            
-            # Extract product cards using JavaScript
-            results = page.evaluate("""() => {
-                const items = [];
-                
-                // Try multiple selectors
-                let cards = document.querySelectorAll('.sh-dgr__gr-auto');
-                console.log('Selector .sh-dgr__gr-auto found:', cards.length);
-                
-                if (cards.length === 0) {
-                    cards = document.querySelectorAll('div[data-docid]');
-                    console.log('Selector div[data-docid] found:', cards.length);
-                }
-                
-                if (cards.length === 0) {
-                    cards = document.querySelectorAll('.sh-dgr__content');
-                    console.log('Selector .sh-dgr__content found:', cards.length);
-                }
-                
-                console.log('Total cards to process:', cards.length);
-                
-                cards.forEach((card, index) => {
-                    if (items.length >= 12) return;
-                    
-                    // Find link
-                    const linkEl = card.querySelector('a');
-                    if (!linkEl) {
-                        console.log('Card', index, '- No link found');
-                        return;
-                    }
-                    
-                    // Extract title
-                    const titleEl = card.querySelector('.tAxDx, .sh-np__product-title, h3, h4');
-                    const title = titleEl ? titleEl.innerText : (linkEl.innerText || 'Unknown Product');
-                    
-                    // Extract price
-                    const priceEl = card.querySelector('.a8Pemb, .T14wmb, [aria-label*="$"], [aria-label*="₹"]');
-                    let price = 0;
-                    if (priceEl) {
-                        const priceText = priceEl.innerText || priceEl.getAttribute('aria-label') || '';
-                        const match = priceText.match(/[₹$]?([\d,]+)/);
-                        price = match ? parseInt(match[1].replace(/,/g, '')) : 0;
-                    }
-                    
-                    console.log('Card', index, '- Title:', title, 'Price:', price);
-                    
-                    // Extract rating
-                    let rating = 4.0;
-                    const ratingEl = card.querySelector('[aria-label*="star"], .Rsc7Yb');
-                    if (ratingEl) {
-                        const ratingText = ratingEl.getAttribute('aria-label') || ratingEl.innerText;
-                        const ratingMatch = ratingText.match(/([0-9.]+)/);
-                        rating = ratingMatch ? parseFloat(ratingMatch[1]) : 4.0;
-                    }
-                    
-                    // Detect source from URL
-                    const url = linkEl.href;
-                    let source = 'unknown';
-                    if (url.includes('amazon.in') || url.includes('amazon.com')) source = 'amazon';
-                    else if (url.includes('flipkart.com')) source = 'flipkart';
-                    else if (url.includes('myntra.com')) source = 'myntra';
-                    else if (url.includes('ajio.com')) source = 'ajio';
-                    else if (url.includes('shein.com')) source = 'shein';
-                    else if (url.includes('croma.com')) source = 'croma';
-                    else if (url.includes('reliancedigital.in')) source = 'reliance';
-                    
-                    if (price > 0 && title !== 'Unknown Product') {
-                        items.push({
-                            name: title,
-                            price: price,
-                            url: url,
-                            source: source,
-                            rating: rating,
-                            reviews: 100
-                        });
-                        console.log('Added product:', title);
-                    } else {
-                        console.log('Skipped - invalid data');
-                    }
-                });
-                
-                console.log('Total products extracted:', items.length);
-                return items;
-            }""")
-            
-            print(f"   ✅ Google Shopping extracted {len(results)} products (before filter)")
-            
-            # Debug: Show what we got
-            for idx, r in enumerate(results[:3]):
-                print(f"   Sample {idx+1}: {r.get('name', 'N/A')[:40]} - ₹{r.get('price', 0)} ({r.get('source', 'unknown')})")
-            
-            page.close()
-            
-            filtered = self._filter_results(results, query)
-            print(f"   📊 After filtering: {len(filtered)} products")
-            
-            return filtered
-            
-        except Exception as e:
-            print(f"   ❌ Google Shopping Error: {e}")
-            import traceback
-            traceback.print_exc()
-            page.close()
-            return []
-
     def search_myntra(self, query: str, count: int = 5):
         """Scrape Myntra search results"""
-        self._ensure_browser()
-        search_url = f"https://www.myntra.com/{query.replace(' ', '-')}"
-        
-        page = self.context.new_page()
-        try:
-            print(f"🛍️ Searching Myntra: {query}")
-            page.goto(search_url, timeout=45000)  # Increased timeout
-            page.wait_for_timeout(4000)  # Wait longer for JS
-            
-            results = page.evaluate("""() => {
-                const items = [];
-                const cards = document.querySelectorAll('li.product-base, ul.results-base li');
-                
-                cards.forEach(card => {
-                    if (items.length >= 8) return;
-                    
-                    const linkEl = card.querySelector('a');
-                    if (!linkEl) return;
-                    
-                    const title = card.querySelector('h3, h4, .product-product')?.innerText || 'Unknown';
-                    const priceText = card.querySelector('.product-price, .product-discountedPrice')?.innerText || '0';
-                    const price = parseInt(priceText.replace(/[^0-9]/g, '')) || 0;
-                    const ratingText = card.querySelector('.product-rating')?.innerText || '4.0';
-                    const rating = parseFloat(ratingText) || 4.0;
-                    
-                    items.push({
-                        name: title,
-                        price: price,
-                        url: 'https://www.myntra.com' + linkEl.getAttribute('href'),
-                        source: 'myntra',
-                        rating: rating,
-                        reviews: 100
-                    });
-                });
-                return items;
-            }""")
-            
-            page.close()
-            print(f"   ✅ Myntra: {len(results)} products")
-            return self._filter_results(results, query)
-        except Exception as e:
-            print(f"   ⚠️ Myntra Error: {str(e)[:100]}")
-            page.close()
-            return []
+        return _to_dicts(self._run(self._search_myntra(query, count)))
+
+    @_ttl_cached('myntra')
+    async def _search_myntra(self, query: str, count: int = 5):
+        return await self._scrape_site(_SITES['myntra'], query)
     
     def search_ajio(self, query: str, count: int = 5):
         """Scrape Ajio search results"""
-        self._ensure_browser()
-        search_url = f"https://www.ajio.com/search/?text={query.replace(' ', '%20')}"
-        
-        page = self.context.new_page()
-        try:
-            print(f"🛍️ Searching Ajio: {query}")
-            page.goto(search_url, timeout=45000)  # Increased timeout
-            page.wait_for_timeout(4000)  # Wait for dynamic content
-            
-            results = page.evaluate("""() => {
-                const items = [];
-                const cards = document.querySelectorAll('.item, .rilrtl-products-list__item');
-                
-                cards.forEach(card => {
-                    if (items.length >= 8) return;
-                    
-                    const linkEl = card.querySelector('a');
-                    if (!linkEl) return;
-                    
-                    const title = card.querySelector('.nameCls, .name')?.innerText || 'Unknown';
-                    const priceText = card.querySelector('.price, .price-value')?.innerText || '0';
-                    const price = parseInt(priceText.replace(/[^0-9]/g, '')) || 0;
-                    
-                    items.push({
-                        name: title,
-                        price: price,
-                        url: 'https://www.ajio.com' + linkEl.getAttribute('href'),
-                        source: 'ajio',
-                        rating: 4.1,
-                        reviews: 80
-                    });
-                });
-                return items;
-            }""")
-            
-            page.close()
-            print(f"   ✅ Ajio: {len(results)} products")
-            return self._filter_results(results, query)
-        except Exception as e:
-            print(f"   ⚠️ Ajio Error: {str(e)[:100]}")
-            page.close()
-            return []
+        return _to_dicts(self._run(self._search_ajio(query, count)))
+
+    @_ttl_cached('ajio')
+    async def _search_ajio(self, query: str, count: int = 5):
+        return await self._scrape_site(_SITES['ajio'], query)
     
     def search_shein(self, query: str, count: int = 5):
         """Scrape Shein India search results"""
-        self._ensure_browser()
-        search_url = f"https://www.sheinindia.in/search/{query.replace(' ', '-')}"
-        
-        page = self.context.new_page()
-        try:
-            print(f"🛍️ Searching Shein: {query}")
-            page.goto(search_url, timeout=60000)  # Shein needs more time
-            page.wait_for_timeout(5000)  # Wait for React to render
-            
-            results = page.evaluate("""() => {
-                const items = [];
-                const cards = document.querySelectorAll('.product-card, .S-product-item, [class*="product"]');
-                
-                cards.forEach(card => {
-                    if (items.length >= 8) return;
-                    
-                    const linkEl = card.querySelector('a');
-                    if (!linkEl) return;
-                    
-                    const title = card.querySelector('.product-card__title, .goods-title, h3')?.innerText || 'Unknown';
-                    const priceText = card.querySelector('.product-card__price, .price-section')?.innerText || '0';
-                    const price = parseInt(priceText.replace(/[^0-9]/g, '')) || 0;
-                    const ratingText = card.querySelector('.she-rate-star, .product-card__rating')?.innerText || '4.2';
-                    const rating = parseFloat(ratingText) || 4.2;
-                    
-                    items.push({
-                        name: title,
-                        price: price,
-                        url: linkEl.href.startsWith('http') ? linkEl.href : 'https://in.shein.com' + linkEl.href,
-                        source: 'shein',
-                        rating: rating,
-                        reviews: 150
-                    });
-                });
-                return items;
-            }""")
-            
-            page.close()
-            print(f"   ✅ Shein: {len(results)} products")
-            return self._filter_results(results, query)
-        except Exception as e:
-            print(f"   ⚠️ Shein Error: {str(e)[:100]}")
-            page.close()
-            return []
+        return _to_dicts(self._run(self._search_shein(query, count)))
+
+    @_ttl_cached('shein')
+    async def _search_shein(self, query: str, count: int = 5):
+        return await self._scrape_site(_SITES['shein'], query)
     
     def search_savana(self, query: str, count: int = 5):
         """Scrape Savana search results"""
-        self._ensure_browser()
-        search_url = f"https://www.savana.in/search?q={query.replace(' ', '+')}"
+        return _to_dicts(self._run(self._search_savana(query, count)))
+
+    @_ttl_cached('savana')
+    async def _search_savana(self, query: str, count: int = 5):
+        return await self._scrape_site(_SITES['savana'], query)
+    
+    async def _scrape_site(self, cfg: SiteConfig, query: str):
+        """Scrape one site described by `cfg`"""
+        search_url = cfg.url_template.format(q=query.replace(' ', cfg.query_sep))
         
-        page = self.context.new_page()
+        if cfg.server_rendered:
+            html = await self._fetch_html(search_url)
+            if html:
+                results = await self._parse_off_loop(_parse_site_html, cfg, html, search_url)
+                if results:
+                    print(f"   ✅ {cfg.label}: {len(results)} products (HTTP)")
+                    return self._filter_results(results, query)
+        
+        context = await self._ensure_browser()
+        page = await self._acquire_page(context)
         try:
-            print(f"🛍️ Searching Savana: {query}")
-            page.goto(search_url, timeout=30000)
-            page.wait_for_timeout(3000)
+            print(f"🛍️ Searching {cfg.label}: {query}")
+            await page.goto(search_url, wait_until='domcontentloaded', timeout=cfg.goto_timeout_ms)
+            await self._wait_for_results(page, cfg.wait_selector, timeout=cfg.wait_timeout_ms)
+            if not await self._has_results(page, cfg.card_selector):
+                print(f"   ⚠️ {cfg.label}: no product cards (blocked or empty page)")
+                await self._release_page(page)
+                return []
             
-            results = page.evaluate("""() => {
-                const items = [];
-                const cards = document.querySelectorAll('.product-item, .product-card, [class*=\"product\"]');
-                
-                cards.forEach(card => {
-                    if (items.length >= 8) return;
-                    
-                    const linkEl = card.querySelector('a');
-                    if (!linkEl) return;
-                    
-                    const title = card.querySelector('.product-title, h3, h4')?.innerText || 'Unknown';
-                    const priceText = card.querySelector('.price, .product-price')?.innerText || '0';
-                    const price = parseInt(priceText.replace(/[^0-9]/g, '')) || 0;
-                    
-                    items.push({
-                        name: title,
-                        price: price,
-                        url: linkEl.href.startsWith('http') ? linkEl.href : 'https://www.savana.in' + linkEl.href,
-                        source: 'savana',
-                        rating: 4.0,
-                        reviews: 60
-                    });
-                });
-                return items;
-            }""")
+            raw = await page.evaluate(_SITE_EXTRACT_JS, {
+                'name': cfg.name,
+                'card': cfg.card_selector,
+                'title': cfg.title_selector,
+                'price': cfg.price_selector,
+                'rating': cfg.rating_selector,
+                'defaultRating': cfg.default_rating,
+                'defaultReviews': cfg.default_reviews,
+            })
+            results = [Product(**item) for item in raw]
             
-            page.close()
+            await self._release_page(page)
+            print(f"   ✅ {cfg.label}: {len(results)} products")
             return self._filter_results(results, query)
         except Exception as e:
-            print(f"Savana Error: {e}")
-            page.close()
+            print(f"   ⚠️ {cfg.label} Error: {str(e)[:100]}")
+            await page.close()
             return []
 
     def _filter_results(self, results, query):
         """Clean up results by removing obvious accessories unless requested"""
         filtered = []
         query_lower = query.lower()
-        # Common junk keywords for tech products
-        negatives = ['case', 'cover', 'screen protector', 'guard', 'tempered glass', 'skin', 'sticker', 'stand', 'fan', 'mount']
         
-        print(f"DEBUG: Filtering {len(results)} raw items for relevance...")
+        # Categories the user asked for ("Laptop" in query -> result MUST say "Laptop")
+        required = [cat for cat in _CATEGORY_MAP if cat in query_lower]
+        
+        debug = log.isEnabledFor(logging.DEBUG)
+        if debug:
+            log.debug("Filtering %d raw items for relevance...", len(results))
         
         for p in results:
-            title = p['name'].lower()
-            is_relevant = True
+            title = p.name.lower()
+            negatives, categories = _scan_title(title)
             
             # 1. Negative Keyword Filter
-            for neg in negatives:
-                if neg in title and neg not in query_lower:
-                    pattern = r'\b' + re.escape(neg) + r'\b'
-                    if re.search(pattern, title):
-                        print(f"DEBUG: Excluded '{p['name'][:30]}...' (Hit negative: {neg})")
-                        is_relevant = False
-                        break
+            neg = next((n for n in negatives if n not in query_lower), None)
+            if neg:
+                if debug:
+                    log.debug("Excluded '%s...' (Hit negative: %s)", p.name[:30], neg)
+                continue
             
-            # 2. Mandatory Category Check
-            # If query asks for "Laptop", result MUST say "Laptop"
-            # Synonyms: phone <-> mobile
-            categories = {
-                'laptop': ['laptop', 'notebook', 'macbook', 'chromebook', 
-                           'victus', 'pavilion', 'omen', 'envy',  # HP models
-                           'loq', 'ideapad', 'legion', 'thinkpad',  # Lenovo models
-                           'tuf', 'rog', 'vivobook', 'zenbook',  # Asus models
-                           'inspiron', 'xps', 'alienware', 'latitude',  # Dell models
-                           'predator', 'aspire', 'swift',  # Acer models
-                           'cyborg', 'katana', 'stealth', 'raider'],  # MSI models
-                'mobile': ['mobile', 'phone', 'smartphone', 'android', 'iphone'],
-                'phone': ['mobile', 'phone', 'smartphone', 'android', 'iphone'],
-                'monitor': ['monitor', 'display', 'screen'],
-                'watch': ['watch'],
-                'tv': ['tv', 'television'],
-                'shoe': ['shoe', 'sneaker', 'boot', 'sandal'],
-            }
+            # 2. Mandatory Category Check (title needs AT LEAST ONE synonym)
+            missing = next((cat for cat in required if cat not in categories), None)
+            if missing:
+                if debug:
+                    log.debug("Excluded '%s...' (Missing mandatory category: %s)", p.name[:30], missing)
+                continue
             
-            if is_relevant:
-                for cat, synonyms in categories.items():
-                    if cat in query_lower: # User asked for this category
-                        # Check if title has AT LEAST ONE of the synonyms
-                        has_cat = any(syn in title for syn in synonyms)
-                        if not has_cat:
-                            print(f"DEBUG: Excluded '{p['name'][:30]}...' (Missing mandatory category: {cat})")
-                            is_relevant = False
-                            break
-
-            if is_relevant:
-                filtered.append(p)
+            filtered.append(p)
                 
         return filtered
 
     def _parse_price(self, text: str) -> float:
-        import re
-        text = text.replace('₹', '').replace(',', '').replace('Rs', '').strip()
-        match = re.search(r'(\d+(?:\.\d+)?)', text)
-        return float(match.group(1)) if match else 0.0
+        return _parse_price(text)
 
     def search_google_shopping_amazon(self, query: str, count: int = 12):
         """
@@ -688,183 +1150,68 @@ class DirectSearchScraper:
         Enhanced Google Shopping scraper with better product extraction.
         Returns products from ALL sources (Amazon, Flipkart, etc.)
         """
-        self._ensure_browser()
+        return _to_dicts(self._run(self._search_google_shopping(query, max_results)))
+
+    @_ttl_cached('google')
+    async def _search_google_shopping(self, query: str, max_results: int = 12):
+        context = await self._ensure_browser()
         # Use Indian locale for better local results
         search_url = f"https://www.google.com/search?q={query.replace(' ', '+')}&tbm=shop&hl=en-IN&gl=IN"
         
-        page = self.context.new_page()
+        page = await self._acquire_page(context)
+        retry_context = None
         try:
             print(f"   🌐 Visiting Google Shopping: {search_url[:80]}...")
-            page.goto(search_url, timeout=30000)
+            await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
             
             # Handle consent popup (EU/India)
             try:
-                accept_btn = page.query_selector('button:has-text("Accept all"), button:has-text("I agree")')
+                accept_btn = await page.query_selector('button:has-text("Accept all"), button:has-text("I agree")')
                 if accept_btn:
-                    accept_btn.click()
-                    page.wait_for_timeout(1000)
+                    await accept_btn.click()
+                    await page.wait_for_load_state('domcontentloaded')
             except:
                 pass
             
-            # CAPTCHA DETECTION
-            page_content = page.content()
-            if "Sorry" in page.title() or "captcha" in page_content.lower() or "unusual traffic" in page_content.lower():
+            # CAPTCHA DETECTION (product cards and Google's captcha form both end the wait)
+            await self._wait_for_results(page, _GS_WAIT_SELECTOR)
+            html = await page.content()
+            if "Sorry" in await page.title() or "captcha" in html.lower() or "unusual traffic" in html.lower():
                 print("   ⚠️ GOOGLE CAPTCHA DETECTED!")
                 print("   💡 TIP: Google Shopping is blocking automated access.")
                 print("   🔄 Trying with fresh context...")
                 
                 # Try one more time with fresh context
-                page.close()
-                self.context.close()
-                self._ensure_browser()
-                page = self.context.new_page()
+                await page.close()
+                retry_context = await self._new_context(DirectSearchScraper._thread_local.browser)
+                page = await retry_context.new_page()
                 
-                import random, time
-                time.sleep(random.uniform(2, 4))
+                import random
+                await asyncio.sleep(random.uniform(2, 4))
                 
-                page.goto(search_url, timeout=30000)
+                await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
+                await self._wait_for_results(page, _GS_WAIT_SELECTOR)
+                html = await page.content()
                 
-                if "captcha" in page.content().lower():
+                if "captcha" in html.lower():
                     print("   ❌ CAPTCHA persists. Google Shopping unavailable.")
-                    page.close()
+                    await page.close()
                     raise Exception("Google Shopping CAPTCHA blocking - triggering API fallback")
                 else:
                     print("   ✅ Retry successful!")
-
-            page.wait_for_timeout(3000)  # Wait for dynamic content
+                    await self._save_storage_state(retry_context)
             
-            # Enhanced JavaScript extraction with multiple selector strategies
-            results = page.evaluate("""() => {
-                const items = [];
-                
-                // Try multiple selectors (Google changes these frequently)
-                let cards = document.querySelectorAll('.sh-dgr__gr-auto, div[data-docid]');
-                console.log('Strategy 1 - Found cards:', cards.length);
-                
-                if (cards.length === 0) {
-                    cards = document.querySelectorAll('.sh-dlr__content, .sh-dgr__content');
-                    console.log('Strategy 2 - Found cards:', cards.length);
-                }
-                
-                if (cards.length === 0) {
-                    // Fallback: Look for any div with product links
-                    cards = document.querySelectorAll('div:has(a[href*="/shopping/product"])');
-                    console.log('Strategy 3 - Found cards:', cards.length);
-                }
-                
-                cards.forEach((card, index) => {
-                    if (items.length >= 20) return;  // Get more results for filtering
-                    
-                    try {
-                        // Extract link (required)
-                        const linkEl = card.querySelector('a[href*="/shopping/product"], a[href*="/url?"]');
-                        if (!linkEl) return;
-                        
-                        let url = linkEl.href;
-                        
-                        // Decode Google redirect URLs
-                        if (url.includes('/url?url=')) {
-                            try {
-                                url = decodeURIComponent(url.split('url=')[1].split('&')[0]);
-                            } catch (e) {}
-                        } else if (url.includes('/url?q=')) {
-                            try {
-                                url = decodeURIComponent(url.split('q=')[1].split('&')[0]);
-                            } catch (e) {}
-                        }
-                        
-                        // Extract title
-                        const titleEl = card.querySelector('h3, h4, .tAxDx, [role="heading"]');
-                        const title = titleEl ? titleEl.innerText.trim() : 'Unknown Product';
-                        
-                        // Extract price (multiple strategies)
-                        let price = 0;
-                        const priceEl = card.querySelector('.a8Pemb, span[aria-label*="₹"], span[aria-label*="$"], [data-sh-pr]');
-                        
-                        if (priceEl) {
-                            const priceText = priceEl.innerText || priceEl.getAttribute('aria-label') || '';
-                            const priceMatch = priceText.match(/[₹$]?\s*([0-9,]+)(\.[0-9]{2})?/);
-                            if (priceMatch) {
-                                price = parseInt(priceMatch[1].replace(/,/g, ''));
-                            }
-                        }
-                        
-                        // If no price found, try data attributes
-                        if (price === 0) {
-                            const priceAttr = card.querySelector('[data-sh-pr], [data-price]');
-                            if (priceAttr) {
-                                const attrValue = priceAttr.getAttribute('data-sh-pr') || priceAttr.getAttribute('data-price');
-                                if (attrValue) {
-                                    price = parseInt(attrValue.replace(/[^0-9]/g, ''));
-                                }
-                            }
-                        }
-                        
-                        // Extract rating (if available)
-                        let rating = 4.0;
-                        const ratingEl = card.querySelector('[aria-label*="star"], .Rsc7Yb');
-                        if (ratingEl) {
-                            const ratingText = ratingEl.getAttribute('aria-label') || ratingEl.innerText;
-                            const ratingMatch = ratingText.match(/([0-9.]+)/);
-                            if (ratingMatch) {
-                                rating = parseFloat(ratingMatch[1]);
-                            }
-                        }
-                        
-                        // Detect source from URL or seller name
-                        let source = 'unknown';
-                        const sellerEl = card.querySelector('.aULzUe, .IuHnof, [data-merchant-name]');
-                        
-                        if (url.includes('amazon.in') || url.includes('amazon.com')) {
-                            source = 'amazon';
-                        } else if (url.includes('flipkart.com')) {
-                            source = 'flipkart';
-                        } else if (url.includes('myntra.com')) {
-                            source = 'myntra';
-                        } else if (url.includes('ajio.com')) {
-                            source = 'ajio';
-                        } else if (url.includes('croma.com')) {
-                            source = 'croma';
-                        } else if (url.includes('reliancedigital.in')) {
-                            source = 'reliance';
-                        } else if (sellerEl) {
-                            const sellerText = sellerEl.innerText.toLowerCase();
-                            if (sellerText.includes('amazon')) source = 'amazon';
-                            else if (sellerText.includes('flipkart')) source = 'flipkart';
-                            else if (sellerText.includes('myntra')) source = 'myntra';
-                            else source = sellerText.replace(/\s+/g, '_');
-                        }
-                        
-                        // Only add valid products
-                        if (price > 0 && title !== 'Unknown Product' && url.startsWith('http')) {
-                            items.push({
-                                name: title,
-                                price: price,
-                                url: url,
-                                source: source,
-                                rating: rating,
-                                reviews: 100
-                            });
-                            console.log(`Product ${index}: ${title} - ₹${price} (${source})`);
-                        }
-                    } catch (err) {
-                        console.error('Error processing card:', err);
-                    }
-                });
-                
-                console.log('Total products extracted:', items.length);
-                return items;
-            }""")
+            # Get more results than needed for filtering
+            results = await self._parse_off_loop(_parse_google_shopping_html, html, 20)
             
             print(f"   ✅ Google Shopping: Extracted {len(results)} products")
             
             # Show sample results
-            if results:
-                print(f"   📦 Sample products:")
+            if results and log.isEnabledFor(logging.DEBUG):
                 for idx, r in enumerate(results[:3]):
-                    print(f"      {idx+1}. {r.get('name', 'N/A')[:50]} - ₹{r.get('price', 0)} ({r.get('source', 'unknown')})")
+                    log.debug("Sample %d: %s - ₹%s (%s)", idx + 1, r.name[:50], r.price, r.source)
             
-            page.close()
+            await self._release_page(page)
             
             # Apply standard filters
             filtered = self._filter_results(results, query)
@@ -882,12 +1229,31 @@ class DirectSearchScraper:
             import traceback
             traceback.print_exc()
             if 'page' in locals():
-                page.close()
+                await page.close()
             return []
+        finally:
+            if retry_context:
+                await retry_context.close()
 
-    # Remove close() logic that kills the browser
     def close(self):
-        """Only close context, keep browser alive"""
-        if self.context:
-            self.context.close()
-        # Do NOT close self.browser or self.playwright here
+        """Shut down this thread's shared context, browser and HTTP client (recreated on next use)"""
+        tl = DirectSearchScraper._thread_local
+        if hasattr(tl, 'playwright') or getattr(tl, 'http', None) is not None:
+            self._run(self._shutdown())
+
+    async def _shutdown(self):
+        tl = DirectSearchScraper._thread_local
+        if getattr(tl, 'http', None) is not None:
+            await tl.http.aclose()
+            tl.http = None
+        if not hasattr(tl, 'playwright'):
+            return
+        if getattr(tl, 'context', None) is not None:
+            await self._save_storage_state(tl.context)
+            await tl.context.close()
+        await tl.browser.close()
+        await tl.playwright.stop()
+        for attr in ('context', 'browser', 'playwright'):
+            delattr(tl, attr)
+        tl.idle_pages = []
+        tl.pages_served = 0
@@ -1,104 +1,201 @@
+import asyncio
 import httpx
-from bs4 import BeautifulSoup
+from lxml.cssselect import CSSSelector
+import html as html_lib
+import lxml.html
 import re
+from scraper.price_cache import get_cached_price, cache_price
+
+_DIGITS_RE = re.compile(r'(\d+)')
+# ₹ / Rs / INR amounts in one alternation: a single linear pass instead of one per currency
+_PRICE_RE = re.compile(r'(?:₹|Rs\.?|INR)\s*(\d+(?:,\d+)*)')
+
+_AMAZON_SELECTORS = [CSSSelector(css) for css in (
+    'span.a-price-whole', 'span.a-offscreen', 'span#priceblock_ourprice', 'span#priceblock_dealprice',
+)]
+_FLIPKART_SELECTORS = [CSSSelector(css) for css in ('div._30jeq3', 'div._1vC4OE', 'div._16Jk6d')]
+
+_SCRIPT_STYLE_RE = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.S | re.I)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+def _page_text(html: str) -> str:
+    """Visible page text for the currency-pattern scan, cut straight from the raw HTML (no DOM build).
+    
+    Tags are removed rather than scanned around so '<b>₹</b>24,999' still reads as '₹24,999',
+    and script/style bodies are left out, as get_text() does.
+    """
+    return html_lib.unescape(_TAG_RE.sub('', _SCRIPT_STYLE_RE.sub('', html)))
+
+# Prices follow their currency marker closely, so only these stretches of text are regex-scanned
+_CURRENCY_MARKERS = ('₹', 'Rs', 'INR')
+_PRICE_WINDOW = 200
+
+def _price_windows(text: str) -> str:
+    """The parts of `text` within _PRICE_WINDOW chars after a currency marker, merged and joined"""
+    starts = []
+    for marker in _CURRENCY_MARKERS:
+        i = text.find(marker)
+        while i != -1:
+            starts.append(i)
+            i = text.find(marker, i + 1)
+    
+    spans = []
+    for i in sorted(starts):
+        if spans and i <= spans[-1][1]:
+            spans[-1][1] = i + _PRICE_WINDOW
+        else:
+            spans.append([i, i + _PRICE_WINDOW])
+    return '\n'.join(text[a:b] for a, b in spans)
 
 class FastPriceExtractor:
-    """Lightning-fast price extractor using httpx (no browser needed)"""
-    
-    def __init__(self):
-        self.client = httpx.Client(
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            },
-            timeout=5.0,
-            follow_redirects=True
-        )
+    """Lightning-fast price extractor using httpx (no browser needed)
+    
+    The async API shares one pooled AsyncClient, so an instance belongs to one
+    event loop; the blocking wrappers drive the instance's own private loop.
+    """
+    
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        # No Accept-Encoding/Connection: httpx advertises exactly the codecs it can decode
+        # (br once brotli is installed) and manages keep-alive itself, incl. over HTTP/2
+        'DNT': '1',
+        'Upgrade-Insecure-Requests': '1'
+    }
+    
+    def __init__(self, max_concurrency: int = 10):
+        self.max_concurrency = max_concurrency
+        self.client = None  # created on first use, inside the loop that will drive it
+        self._loop = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                headers=self.HEADERS,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0),
+                http2=True,  # many product pages per retailer multiplex over one connection
+                timeout=httpx.Timeout(5.0, connect=2.0),
+                follow_redirects=True
+            )
+        return self.client
+    
+    def _run(self, coro):
+        """Run a coroutine on this extractor's private loop (kept open so pooled connections survive)"""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
     
     def extract_price(self, url: str, source: str) -> float:
+        """Extract price via fast HTTP request (blocking)"""
+        return self._run(self.extract_price_async(url, source))
+    
+    def extract_prices(self, items) -> list:
+        """Blocking form of extract_prices_batch"""
+        return self._run(self.extract_prices_batch(items))
+    
+    async def fetch_html(self, url: str, done=None, max_bytes: int = None):
+        """GET a page; None on errors, non-200 responses and bot-check pages.
+        
+        The body is streamed: reading stops once `max_bytes` have arrived, or as soon
+        as done(html_so_far) is true after a closing </script> (e.g. JSON-LD parsed).
+        """
+        try:
+            async with self._get_client().stream('GET', url) as response:
+                if response.status_code != 200:
+                    return None
+                encoding = response.charset_encoding or 'utf-8'
+                buf = bytearray()
+                async for chunk in response.aiter_bytes():
+                    buf += chunk
+                    if max_bytes and len(buf) >= max_bytes:
+                        break
+                    # Look back a few bytes so a tag split across chunks is still seen
+                    if done and b'</script>' in buf[-(len(chunk) + 8):] and done(buf.decode(encoding, errors='replace')):
+                        break
+        except httpx.HTTPError:
+            return None
+        
+        html = buf.decode(encoding, errors='replace')
+        if 'captcha' in html.lower():
+            return None
+        return html
+    
+    async def extract_price_async(self, url: str, source: str) -> float:
         """Extract price via fast HTTP request"""
+        cached = get_cached_price(url)
+        if cached is not None:
+            return cached
+        return cache_price(url, await self._extract_price_uncached(url, source))
+    
+    async def _extract_price_uncached(self, url: str, source: str) -> float:
         try:
-            response = self.client.get(url)
-            if response.status_code != 200:
+            html = await self.fetch_html(url)
+            if html is None:
                 return 0.0
             
-            soup = BeautifulSoup(response.text, 'lxml')
-            
             if 'amazon' in source:
-                return self._extract_amazon_price(soup)
+                return self._extract_amazon_price(lxml.html.fromstring(html))
             elif 'flipkart' in source:
-                return self._extract_flipkart_price(soup)
+                return self._extract_flipkart_price(lxml.html.fromstring(html))
             else:
-                return self._extract_generic_price(soup)
+                return self._extract_generic_price(html)
                 
         except Exception as e:
             return 0.0
     
-    def _extract_amazon_price(self, soup) -> float:
-        """Extract price from Amazon HTML"""
-        selectors = [
-            ('span', {'class': 'a-price-whole'}),
-            ('span', {'class': 'a-offscreen'}),
-            ('span', {'id': 'priceblock_ourprice'}),
-            ('span', {'id': 'priceblock_dealprice'})
-        ]
+    async def extract_prices_batch(self, items) -> list:
+        """Extract prices for [(url, source), ...] concurrently; results keep input order (0.0 = not found)"""
+        sem = asyncio.Semaphore(self.max_concurrency)
         
-        for tag, attrs in selectors:
-            element = soup.find(tag, attrs)
-            if element:
-                price_text = element.get_text().replace(',', '').replace('₹', '').strip()
-                try:
-                    return float(re.search(r'\d+', price_text).group())
-                except:
-                    continue
-        return 0.0
+        async def bounded(url, source):
+            async with sem:
+                return await self.extract_price_async(url, source)
+        
+        results = await asyncio.gather(*(bounded(url, source) for url, source in items), return_exceptions=True)
+        return [0.0 if isinstance(r, BaseException) else r for r in results]
     
-    def _extract_flipkart_price(self, soup) -> float:
+    def _extract_amazon_price(self, tree) -> float:
+        """Extract price from Amazon HTML"""
+        return self._first_price(tree, _AMAZON_SELECTORS)
+    
+    def _extract_flipkart_price(self, tree) -> float:
         """Extract price from Flipkart HTML"""
-        selectors = [
-            ('div', {'class': '_30jeq3'}),
-            ('div', {'class': '_1vC4OE'}),
-            ('div', {'class': '_16Jk6d'})
-        ]
-        
-        for tag, attrs in selectors:
-            element = soup.find(tag, attrs)
-            if element:
-                price_text = element.get_text().replace(',', '').replace('₹', '').strip()
+        return self._first_price(tree, _FLIPKART_SELECTORS)
+    
+    def _first_price(self, tree, selectors) -> float:
+        """Digits of the first element matched by the first selector that parses"""
+        for selector in selectors:
+            found = selector(tree)
+            if found:
+                price_text = found[0].text_content().replace(',', '').replace('₹', '').strip()
                 try:
-                    return float(re.search(r'\d+', price_text).group())
+                    return float(_DIGITS_RE.search(price_text).group())
                 except:
                     continue
         return 0.0
     
-    def _extract_generic_price(self, soup) -> float:
+    def _extract_generic_price(self, html: str) -> float:
         """Extract price using generic patterns"""
         # Look for common price patterns in the entire page
-        text = soup.get_text()
-        patterns = [
-            r'₹\s*(\d+(?:,\d+)*)',
-            r'Rs\.?\s*(\d+(?:,\d+)*)',
-            r'INR\s*(\d+(?:,\d+)*)'
-        ]
-        
+        text = _price_windows(_page_text(html))
         prices = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                try:
-                    p = float(match.replace(',', ''))
-                    if 50 < p < 100000:
-                        prices.append(p)
-                except:
-                    continue
+        for match in _PRICE_RE.finditer(text):
+            p = float(match.group(1).replace(',', ''))
+            if 50 < p < 100000:
+                prices.append(p)
         
         return min(prices) if prices else 0.0
     
+    async def aclose(self):
+        """Close HTTP client (from the loop that used it)"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+    
     def close(self):
-        """Close HTTP client"""
-        self.client.close()
+        """Close HTTP client and the private loop"""
+        if self._loop is not None:
+            self._run(self.aclose())
+            self._loop.close()
+            self._loop = None
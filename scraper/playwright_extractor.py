@@ -1,162 +1,391 @@
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from playwright.async_api import async_playwright
+from lxml.cssselect import CSSSelector
+from scraper.fast_price_extractor import FastPriceExtractor, _DIGITS_RE, _PRICE_RE, _page_text, _price_windows
+from scraper.price_cache import get_cached_price, cache_price
+from urllib.parse import urlparse
+import asyncio
+import atexit
+import lxml.html
+import os
 import re
+import threading
+
+try:
+    import orjson  # several times faster than json on the ~100KB JSON-LD blobs retailers ship
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
+
+try:
+    import numpy as np  # vectorised candidate filtering on listing-heavy pages
+except ImportError:
+    np = None
+
+try:
+    from numba import njit  # compiles _filter_prices to native code (cached on disk after first run)
+except ImportError:
+    njit = None
+
+# Launch the browser and its warm tabs when the extractor is built, not on the first price miss
+PRICE_BROWSER_WARM_START = os.getenv('PRICE_BROWSER_WARM_START', '0') == '1'
+
+# JSON-LD bodies pulled straight from the raw HTML (no parse tree needed for the fast path)
+_LDJSON_RE = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.S | re.I)
+
+# What each source's price element looks like; waiting for it replaces fixed sleeps
+PRICE_WAIT_SELECTORS = {
+    'amazon': 'span.a-price-whole, span.a-offscreen, #priceblock_ourprice, #priceblock_dealprice',
+    'flipkart': 'div._30jeq3, div._1vC4OE, div._16Jk6d, div._25b18c',
+    'croma': '#pdp-product-price, div.cp-price, span.amount, h2.cp-price',
+    'reliance': 'span.pdp__offerPrice, span.pdp__dealPrice, span.pdp__mrpPrice',
+}
+GENERIC_WAIT_SELECTOR = 'script[type="application/ld+json"], meta[itemprop="price"], meta[property="og:price:amount"]'
+
+# The HTTP probe reads at most this much of a page (structured data lives near the top)
+HTTP_PROBE_MAX_BYTES = 256 * 1024
+
+# Price elements per source, in priority order (compiled once; lxml matches them in C)
+AMAZON_PRICE_SELECTORS = [CSSSelector(css) for css in (
+    'span.a-price-whole', 'span.a-offscreen', 'span#priceblock_ourprice', 'span#priceblock_dealprice', 'span.a-price',
+)]
+FLIPKART_PRICE_SELECTORS = [CSSSelector(css) for css in (
+    'div._30jeq3', 'div._1vC4OE', 'div._16Jk6d', 'div._25b18c',
+)]
+CROMA_PRICE_SELECTORS = [CSSSelector(css) for css in (
+    'span#pdp-product-price', 'div.cp-price', 'span.amount', 'h2.cp-price',
+)]
+RELIANCE_PRICE_SELECTORS = [CSSSelector(css) for css in (
+    'span.pdp__offerPrice', 'span.pdp__dealPrice', 'span.pdp__mrpPrice',
+)]
+META_PRICE_SELECTORS = [CSSSelector(css) for css in (
+    'meta[property="og:price:amount"]', 'meta[property="product:price:amount"]',
+    'meta[itemprop="price"]', 'meta[name="twitter:data1"]',
+)]
+
+# Close/accept controls, clicked in-page by _DISMISS_JS: buttons by (case-insensitive)
+# text like Playwright's :has-text(), then plain CSS selectors
+DISMISS_BUTTON_TEXTS = ['accept', 'close', '×', 'got it']
+DISMISS_SELECTORS = [
+    'button[aria-label="Close"]',
+    'div.modal-close',
+    'a.close-modal'
+]
+
+# One round-trip for every dismiss probe plus the overlay removal
+_DISMISS_JS = """([texts, selectors]) => {
+    const click = el => { try { el.click(); } catch (e) {} };
+    const buttons = Array.from(document.querySelectorAll('button'));
+    for (const text of texts) {
+        const btn = buttons.find(b => (b.textContent || '').toLowerCase().includes(text));
+        if (btn) click(btn);
+    }
+    for (const sel of selectors) {
+        const el = document.querySelector(sel);
+        if (el) click(el);
+    }
+    // Remove overlay divs (Nuclear option)
+    const overlays = document.querySelectorAll('[class*="modal"], [class*="popup"], [class*="overlay"], [id*="modal"]');
+    overlays.forEach(el => {
+        if (el.style.zIndex > 100 || getComputedStyle(el).position === 'fixed') {
+            el.remove();
+        }
+    });
+}"""
+
+def _filter_prices(arr):
+    """Range/year/EMI rules over a float64 candidate array in two flat loops; 0.0 if nothing survives"""
+    max_p = 0.0
+    for p in arr:
+        if 100.0 < p < 1000000.0 and not (2020.0 <= p <= 2030.0) and p > max_p:
+            max_p = p
+    if max_p == 0.0:
+        return 0.0
+    
+    # Heuristic: If we have prices > 10000, ignore anything < 5000 (EMI)
+    floor = 5000.0 if max_p > 10000.0 else 0.0
+    min_p = max_p
+    for p in arr:
+        if floor < p < min_p and 100.0 < p and not (2020.0 <= p <= 2030.0):
+            min_p = p
+    return min_p
+
+if njit is not None:
+    _filter_prices = njit(cache=True)(_filter_prices)
+
+def _pick_generic_price(matches) -> float:
+    """Choose the likely deal price among currency-pattern hits ('24,999' strings)"""
+    if not matches:
+        return 0.0
+    if np is None:
+        prices = [p for p in (float(m.replace(',', '')) for m in matches)
+                  if 100 < p < 1000000 and not 2020 <= p <= 2030]  # Filter junk (years)
+        if not prices: return 0.0
+        # Heuristic: If we have prices > 10000, ignore anything < 5000 (EMI)
+        if max(prices) > 10000:
+            prices = [x for x in prices if x > 5000]
+        # Return likely deal price (min of valid big prices)
+        return min(prices)
+    
+    arr = np.fromiter((float(m.replace(',', '')) for m in matches), dtype=np.float64, count=len(matches))
+    if njit is not None:
+        return float(_filter_prices(arr))
+    arr = arr[(arr > 100) & (arr < 1000000) & ((arr < 2020) | (arr > 2030))]
+    if not arr.size: return 0.0
+    if arr.max() > 10000:
+        arr = arr[arr > 5000]
+    return float(arr.min())
 
 class PlaywrightPriceExtractor:
-    """Fast and reliable price extractor using Playwright"""
+    """Fast and reliable price extractor using Playwright
+    
+    Async Playwright objects are bound to the loop that created them, so the
+    blocking wrappers drive one private loop that lives as long as the browser
+    (one caller at a time, so threads can share an instance - see get_extractor).
+    """
     
-    def __init__(self):
+    def __init__(self, max_parallel: int = 3):
         self.playwright = None
         self.browser = None
         self.context = None
+        self.max_parallel = max_parallel
+        self._loop = None
+        self._run_lock = threading.Lock()
+        self._launch_lock = None
+        self._page_slots = None  # caps open tabs at max_parallel
+        self._idle_pages = []  # warm tabs not in use
+        self._atexit_registered = False
+        self._http = FastPriceExtractor()  # its AsyncClient binds to our loop on first use
+        self._needs_browser = {}  # domain -> True once only the browser got a price there
+        if PRICE_BROWSER_WARM_START:
+            self.warm_up()
     
-    def _ensure_browser(self):
+    def _run(self, coro):
+        with self._run_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+            return self._loop.run_until_complete(coro)
+    
+    async def _ensure_browser(self):
         """Initialize browser only when needed"""
-        if not self.browser:
-            self.playwright = sync_playwright().start()
-            self.browser = self.playwright.chromium.launch(
-                headless=False, # Visible browser to bypass bot detection
-                args=['--disable-blink-features=AutomationControlled']
-            )
-            self.context = self.browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080}
-            )
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+            self._page_slots = asyncio.Semaphore(self.max_parallel)
+        async with self._launch_lock:  # parallel pages must not each launch a browser
+            if not self.browser:
+                self.playwright = await async_playwright().start()
+                self.browser = await self.playwright.chromium.launch(
+                    headless=False, # Visible browser to bypass bot detection
+                    args=['--disable-blink-features=AutomationControlled']
+                )
+                self.context = await self.browser.new_context(
+                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                    viewport={'width': 1920, 'height': 1080}
+                )
+                # Prices come from DOM text/JSON-LD: skip images, fonts, media, CSS and trackers.
+                # Imported here so the extractor (and scraper.providers) load without direct_scraper's deps.
+                try:
+                    from scraper.direct_scraper import _block_heavy_requests
+                    await self.context.route("**/*", _block_heavy_requests)
+                except ImportError:
+                    pass
+                self._idle_pages = [await self.context.new_page() for _ in range(self.max_parallel)]
+                if not self._atexit_registered:
+                    atexit.register(self.close)  # don't leave Chromium running after the process
+                    self._atexit_registered = True
+    
+    def warm_up(self):
+        """Launch the browser and open its tabs now, so the first extraction pays no cold start"""
+        self._run(self._ensure_browser())
     
     def extract_price(self, url: str, source: str) -> float:
-        """Extract real price from product URL"""
+        """Extract real price from product URL (blocking)"""
+        return self._run(self.extract_price_async(url, source))
+    
+    def extract_prices(self, items) -> list:
+        """Blocking form of extract_prices_batch"""
+        return self._run(self.extract_prices_batch(items))
+    
+    async def extract_prices_batch(self, items, max_parallel: int = None) -> list:
+        """Extract prices for [(url, source), ...] in parallel pages of one context (input order kept)"""
+        sem = asyncio.Semaphore(max_parallel or self.max_parallel)
+        
+        async def bounded(url, source):
+            async with sem:
+                return await self.extract_price_async(url, source)
+        
+        results = await asyncio.gather(*(bounded(url, source) for url, source in items), return_exceptions=True)
+        return [0.0 if isinstance(r, BaseException) else r for r in results]
+    
+    async def extract_price_async(self, url: str, source: str) -> float:
+        """Extract real price from product URL, trying a plain HTTP GET before the browser"""
+        cached = get_cached_price(url)
+        if cached is not None:
+            print(f"  ✓ Cached price: ₹{cached}")
+            return cached
+        
+        domain = urlparse(url).netloc
+        if not self._needs_browser.get(domain):
+            price = await self._extract_over_http(url)
+            if price > 0:
+                self._needs_browser[domain] = False
+                print(f"  ✓ Extracted over HTTP: ₹{price}")
+                return cache_price(url, price)
+        
+        price = await self._extract_with_browser(url, source)
+        if price > 0:
+            self._needs_browser[domain] = True
+        return cache_price(url, price)
+    
+    async def _extract_over_http(self, url: str) -> float:
+        """Structured-data price (JSON-LD / meta tags) from the server HTML, 0.0 if absent"""
+        html = await self._http.fetch_html(
+            url,
+            done=lambda head: self._extract_from_jsonld(head) > 0,  # JSON-LD usually sits in <head>
+            max_bytes=HTTP_PROBE_MAX_BYTES
+        )
+        if html is None:
+            return 0.0
+        price = self._extract_from_jsonld(html)
+        if price > 0:
+            return price
+        return self._extract_from_meta(lxml.html.fromstring(html))
+    
+    async def _extract_with_browser(self, url: str, source: str) -> float:
         try:
-            self._ensure_browser()
-            page = self.context.new_page()
-            page.goto(url, timeout=45000, wait_until='domcontentloaded') # Increased timeout
-            page.wait_for_timeout(2000)  # Initial wait for page skeleton
-            
-            # DISMISS POPUPS/MODALS
-            # 1. Press Escape (Closes most modals)
-            try:
-                page.keyboard.press('Escape')
-                page.wait_for_timeout(500)
-            except: pass
-            
-            # 2. Click common close/accept buttons
-            dismiss_selectors = [
-                'button:has-text("Accept")',
-                'button:has-text("Close")',
-                'button:has-text("×")',
-                'button:has-text("Got it")',
-                'button[aria-label="Close"]',
-                'div.modal-close',
-                'a.close-modal'
-            ]
-            for selector in dismiss_selectors:
+            await self._ensure_browser()
+            async with self._page_slots:
+                page = await self._acquire_page()
                 try:
-                    if page.locator(selector).count() > 0:
-                        page.locator(selector).first.click(timeout=1000)
-                        page.wait_for_timeout(300)
-                except: pass
-            
-            # 3. Remove overlay divs via JavaScript (Nuclear option)
-            try:
-                page.evaluate("""() => {
-                    const overlays = document.querySelectorAll('[class*="modal"], [class*="popup"], [class*="overlay"], [id*="modal"]');
-                    overlays.forEach(el => {
-                        if (el.style.zIndex > 100 || getComputedStyle(el).position === 'fixed') {
-                            el.remove();
-                        }
-                    });
-                }""")
-            except: pass
-            
-            page.wait_for_timeout(3000)  # Wait after dismissal for dynamic content
-            
-            html = page.content()
-            page_title = page.title()
-            page.close()
+                    await page.goto(url, timeout=45000, wait_until='domcontentloaded') # Increased timeout
+                    
+                    # Clear popups while the price renders (fast pages don't pay a fixed wait)
+                    await asyncio.gather(
+                        self._wait_for_price(page, source),
+                        self._dismiss_popups(page)
+                    )
+                    
+                    html = await page.content()
+                    page_title = await page.title()
+                finally:
+                    await self._release_page(page)
             
             # Debug output
             print(f"  → Visited: {url[:80]}")
             print(f"  → Title: {page_title[:60]}")
             
-            soup = BeautifulSoup(html, 'lxml')
-            
             # Try JSON-LD first (most reliable for OEM sites)
-            price = self._extract_from_jsonld(soup)
+            price = self._extract_from_jsonld(html)
             if price > 0:
                 print(f"  ✓ Extracted from JSON-LD: ₹{price}")
                 return price
             
+            tree = lxml.html.fromstring(html)
+            
             if 'amazon' in source:
-                return self._extract_amazon_price(soup)
+                return self._extract_amazon_price(tree)
             elif 'flipkart' in source:
-                return self._extract_flipkart_price(soup)
+                return self._extract_flipkart_price(tree)
             elif 'croma' in source:
-                return self._extract_croma_price(soup)
+                return self._extract_croma_price(tree)
             elif 'reliance' in source:
-                return self._extract_reliance_price(soup)
+                return self._extract_reliance_price(tree)
             else:
-                return self._extract_generic_price(soup)
+                return self._extract_generic_price(tree, html)
                 
         except Exception as e:
             print(f"Playwright error for {url[:50]}: {str(e)[:100]}")
             return 0.0
     
-    def _extract_amazon_price(self, soup) -> float:
+    async def _acquire_page(self):
+        """A warm tab, or a new one (caller holds a _page_slots permit)"""
+        while self._idle_pages:
+            page = self._idle_pages.pop()
+            if not page.is_closed():
+                return page
+        browser = self.browser
+        try:
+            return await self.context.new_page()
+        except Exception:
+            await self._drop_browser(browser)  # crashed/closed: relaunch on the next _ensure_browser
+            raise
+    
+    async def _release_page(self, page):
+        """Blank the tab and keep it warm; a broken one is closed (its slot frees either way)"""
+        try:
+            await page.goto('about:blank')
+        except Exception:
+            try:
+                await page.close()
+            except Exception:
+                pass
+            return
+        if page.context is self.context:  # not a tab of a browser dropped meanwhile
+            self._idle_pages.append(page)
+    
+    async def _drop_browser(self, browser):
+        """Forget a dead browser so _ensure_browser launches a fresh one"""
+        async with self._launch_lock:
+            if browser is None or self.browser is not browser:
+                return  # another task already dropped it
+            playwright = self.playwright
+            self.browser = self.context = self.playwright = None
+            self._idle_pages = []
+            for close in (browser.close, playwright.stop):
+                try:
+                    await close()
+                except Exception:
+                    pass
+    
+    async def _wait_for_price(self, page, source: str):
+        """Wait until the source's price element exists (4s cap, then parse what loaded)"""
+        selector = next((sel for key, sel in PRICE_WAIT_SELECTORS.items() if key in source), GENERIC_WAIT_SELECTOR)
+        try:
+            await page.wait_for_selector(selector, state='attached', timeout=4000)
+        except Exception:
+            pass
+    
+    async def _dismiss_popups(self, page):
+        """Close cookie banners/modals that can hide the price"""
+        # 1. Press Escape (Closes most modals)
+        try:
+            await page.keyboard.press('Escape')
+        except: pass
+        
+        # 2. Click common close/accept buttons and strip overlays, all in one evaluate
+        try:
+            await page.evaluate(_DISMISS_JS, [DISMISS_BUTTON_TEXTS, DISMISS_SELECTORS])
+        except: pass
+    
+    def _extract_amazon_price(self, tree) -> float:
         """Extract price from Amazon HTML"""
-        selectors = [
-            ('span', {'class': 'a-price-whole'}),
-            # ... (keep existing) ...
-            ('span', {'class': 'a-offscreen'}),
-            ('span', {'id': 'priceblock_ourprice'}),
-            ('span', {'id': 'priceblock_dealprice'}),
-            ('span', {'class': 'a-price'}),
-        ]
-        return self._run_selectors(soup, selectors)
-
-    def _extract_flipkart_price(self, soup) -> float:
-        selectors = [
-            ('div', {'class': '_30jeq3'}),
-            ('div', {'class': '_1vC4OE'}),
-            ('div', {'class': '_16Jk6d'}),
-            ('div', {'class': '_25b18c'}),
-        ]
-        return self._run_selectors(soup, selectors)
-
-    def _extract_croma_price(self, soup) -> float:
-        selectors = [
-            ('span', {'id': 'pdp-product-price'}),
-            ('div', {'class': 'cp-price'}),
-            ('span', {'class': 'amount'}),
-            ('h2', {'class': 'cp-price'}),
-        ]
-        return self._run_selectors(soup, selectors)
-
-    def _extract_reliance_price(self, soup) -> float:
-        selectors = [
-            ('span', {'class': 'pdp__offerPrice'}),
-            ('span', {'class': 'pdp__dealPrice'}),
-            ('span', {'class': 'pdp__mrpPrice'}),
-        ]
-        return self._run_selectors(soup, selectors)
-
-    def _run_selectors(self, soup, selectors):
-        for tag, attrs in selectors:
-            elements = soup.find_all(tag, attrs)
-            for element in elements:
-                text = element.get_text().replace(',', '').replace('₹', '').strip()
-                match = re.search(r'(\d+)', text)
+        return self._run_selectors(tree, AMAZON_PRICE_SELECTORS)
+
+    def _extract_flipkart_price(self, tree) -> float:
+        return self._run_selectors(tree, FLIPKART_PRICE_SELECTORS)
+
+    def _extract_croma_price(self, tree) -> float:
+        return self._run_selectors(tree, CROMA_PRICE_SELECTORS)
+
+    def _extract_reliance_price(self, tree) -> float:
+        return self._run_selectors(tree, RELIANCE_PRICE_SELECTORS)
+
+    def _run_selectors(self, tree, selectors):
+        for selector in selectors:
+            for element in selector(tree):
+                text = element.text_content().replace(',', '').replace('₹', '').strip()
+                match = _DIGITS_RE.search(text)
                 if match:
                     price = float(match.group(1))
                     if 100 < price < 1000000: # Raised limit to 10 Lakh
                         return price
         return 0.0
     
-    def _extract_from_jsonld(self, soup) -> float:
+    def _extract_from_jsonld(self, html: str) -> float:
         """Extract price from JSON-LD structured data (Schema.org Product)"""
-        import json
-        scripts = soup.find_all('script', {'type': 'application/ld+json'})
-        for script in scripts:
+        for body in _LDJSON_RE.findall(html):
             try:
-                data = json.loads(script.string)
+                data = _json_loads(body)
                 # Handle both single object and array
                 if isinstance(data, list):
                     data = data[0] if data else {}
@@ -180,58 +409,54 @@ class PlaywrightPriceExtractor:
             except: pass
         return 0.0
     
-    def _extract_generic_price(self, soup) -> float:
-        """Extract price using generic patterns and meta tags"""
-        # 1. Meta Tags (High confidence)
-        meta_selectors = [
-            ('meta', {'property': 'og:price:amount'}),
-            ('meta', {'property': 'product:price:amount'}),
-            ('meta', {'itemprop': 'price'}),
-            ('meta', {'name': 'twitter:data1'}),
-        ]
-        for tag, attrs in meta_selectors:
-            el = soup.find(tag, attrs)
-            if el and el.get('content'):
+    def _extract_from_meta(self, tree) -> float:
+        """Extract price from product meta tags (OpenGraph / microdata)"""
+        for selector in META_PRICE_SELECTORS:
+            found = selector(tree)
+            if found and found[0].get('content'):
                 try:
-                    c = el['content'].replace(',', '').replace('₹', '')
+                    c = found[0].get('content').replace(',', '').replace('₹', '')
                     p = float(c)
                     if 100 < p < 1000000: return p
                 except: pass
+        return 0.0
+    
+    def _extract_generic_price(self, tree, html: str) -> float:
+        """Extract price using generic patterns and meta tags"""
+        # 1. Meta Tags (High confidence)
+        price = self._extract_from_meta(tree)
+        if price > 0:
+            return price
 
         # 2. Text Patterns (Fallback)
-        text = soup.get_text()
-        patterns = [
-            r'₹\s*(\d+(?:,\d+)*)',
-            r'Rs\.?\s*(\d+(?:,\d+)*)',
-            r'INR\s*(\d+(?:,\d+)*)'
-        ]
-        
-        prices = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                try:
-                    p = float(match.replace(',', ''))
-                    # Filter junk
-                    if 2020 <= p <= 2030: continue
-                    if 100 < p < 1000000: # Raised limit
-                        prices.append(p)
-                except: continue
-        
-        if not prices: return 0.0
-        
-        # Heuristic: If we have prices > 10000, ignore anything < 5000 (EMI)
-        max_p = max(prices)
-        if max_p > 10000:
-            prices = [x for x in prices if x > 5000]
-            if not prices: return max_p # Should not happen
-        
-        # Return likely deal price (min of valid big prices)
-        return min(prices)
+        text = _price_windows(_page_text(html))
+        matches = _PRICE_RE.findall(text)
+        return _pick_generic_price(matches)
     
-    def close(self):
-        """Close browser and cleanup"""
+    async def _shutdown(self):
+        await self._http.aclose()
         if self.browser:
-            self.browser.close()
+            await self.browser.close()
         if self.playwright:
-            self.playwright.stop()
+            await self.playwright.stop()
+        self.browser = self.context = self.playwright = None
+        self._idle_pages = []
+        self._launch_lock = self._page_slots = None  # bound to the loop close() is about to close
+    
+    def close(self):
+        """Close browser and cleanup"""
+        if self._loop is not None:
+            self._run(self._shutdown())
+            self._loop.close()
+            self._loop = None
+
+_INSTANCE = None
+_INSTANCE_LOCK = threading.Lock()
+
+def get_extractor() -> PlaywrightPriceExtractor:
+    """The process-wide extractor, so every scraper shares one Chromium"""
+    global _INSTANCE
+    with _INSTANCE_LOCK:
+        if _INSTANCE is None:
+            _INSTANCE = PlaywrightPriceExtractor()
+    return _INSTANCE
@@ -0,0 +1,22 @@
+from cachetools import TTLCache
+import os
+import threading
+
+# Product-page prices seen recently, shared by every price extractor (PRICE_CACHE_TTL=0 disables)
+PRICE_CACHE_TTL = int(os.getenv('PRICE_CACHE_TTL', '600'))
+_PRICE_CACHE = TTLCache(maxsize=1024, ttl=max(PRICE_CACHE_TTL, 1))
+_PRICE_CACHE_LOCK = threading.Lock()
+
+def get_cached_price(url: str):
+    """Price extracted for `url` within the TTL, else None"""
+    if PRICE_CACHE_TTL <= 0:
+        return None
+    with _PRICE_CACHE_LOCK:
+        return _PRICE_CACHE.get(url)
+
+def cache_price(url: str, price: float) -> float:
+    """Remember a successful extraction (0.0 = failure, so it is retried next time)"""
+    if price > 0 and PRICE_CACHE_TTL > 0:
+        with _PRICE_CACHE_LOCK:
+            _PRICE_CACHE[url] = price
+    return price
@@ -1,30 +1,37 @@
-import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from urllib3.exceptions import MaxRetryError
 import undetected_chromedriver as uc
+from scraper.price_cache import get_cached_price, cache_price
+
+# Price elements per source; extraction starts as soon as one is in the DOM
+PRICE_WAIT_SELECTORS = {
+    'amazon': 'span.a-price-whole, span.a-offscreen, #priceblock_ourprice, #priceblock_dealprice',
+    'flipkart': 'div._30jeq3, div._1vC4OE, div._16Jk6d',
+    'croma': 'span.amount, span.new-price, span.sale-price',
+}
+
+# Raised when Chrome/chromedriver itself is gone: "chrome not reachable"/invalid session are
+# WebDriverExceptions, a dead chromedriver is a MaxRetryError. Page errors (net::ERR_*) are
+# WebDriverExceptions too, so _driver_alive() tells the two apart before a relaunch
+_DEAD_DRIVER_ERRORS = (WebDriverException, MaxRetryError, ConnectionError)
 
 class PriceExtractor:
     """Extracts real prices from product pages using Selenium"""
     
     def __init__(self):
         self.driver = None
+        self._driver_ok = False  # cleared when a call finds the session dead
     
     def _init_driver(self):
-        """Initialize undetected Chrome driver with crash prevention"""
+        """Initialize undetected Chrome driver (reused until a call on it fails)"""
+        if self.driver and self._driver_ok:
+            return
         if self.driver:
-            try:
-                # Test if driver is still alive
-                self.driver.title
-                return  # Driver is working
-            except:
-                # Driver is dead, recreate it
-                try:
-                    self.driver.quit()
-                except:
-                    pass
-                self.driver = None
+            self._reset_driver()
         
         try:
             options = uc.ChromeOptions()
@@ -36,16 +43,47 @@ class PriceExtractor:
             options.add_argument('--disable-blink-features=AutomationControlled')
             
             self.driver = uc.Chrome(options=options, version_main=143)  # Match your Chrome version
+            self._driver_ok = True
         except Exception as e:
             print(f"Failed to init Chrome: {e}")
             self.driver = None
     
+    def _driver_alive(self) -> bool:
+        """Cheap round-trip to Chrome; False if the session or chromedriver is gone"""
+        try:
+            self.driver.current_window_handle
+            return True
+        except Exception:
+            return False
+    
+    def _reset_driver(self):
+        """Drop a dead driver so _init_driver builds a new one"""
+        try:
+            self.driver.quit()
+        except:
+            pass
+        self.driver = None
+    
     def extract_price(self, url: str, source: str) -> float:
         """Extract real price from product URL"""
+        cached = get_cached_price(url)
+        if cached is not None:
+            return cached
+        return cache_price(url, self._extract_price_uncached(url, source))
+    
+    def _extract_price_uncached(self, url: str, source: str) -> float:
         try:
             self._init_driver()
-            self.driver.get(url)
-            time.sleep(2)  # Wait for dynamic content
+            try:
+                self.driver.get(url)
+            except _DEAD_DRIVER_ERRORS:
+                if self._driver_alive():
+                    raise  # the page failed, not the browser
+                # Driver died since the last call - relaunch once and retry
+                self._reset_driver()
+                self._init_driver()
+                self.driver.get(url)
+            self._wait_for_price(source)
             
             if 'amazon' in source:
                 return self._extract_amazon_price()
@@ -57,9 +95,21 @@ class PriceExtractor:
                 return 0.0
                 
         except Exception as e:
+            if isinstance(e, _DEAD_DRIVER_ERRORS) and not self._driver_alive():
+                self._driver_ok = False  # relaunch up front next time
             print(f"Price extraction error for {url}: {e}")
             return 0.0
     
+    def _wait_for_price(self, source: str):
+        """Wait (up to 4s) for the source's price element instead of a fixed sleep"""
+        selector = next((sel for key, sel in PRICE_WAIT_SELECTORS.items() if key in source), None)
+        if selector is None:
+            return
+        try:
+            WebDriverWait(self.driver, 4).until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+        except TimeoutException:
+            pass  # Late or missing price - the extractors below still try every selector
+    
     def _extract_amazon_price(self) -> float:
         """Extract price from Amazon page"""
         selectors = [
@@ -1,31 +1,252 @@
+import asyncio
+import httpx
+import logging
+import multiprocessing
+import operator
 import os
 import random
 import re
 import requests
+import threading
 import time
+from collections import defaultdict
+from functools import lru_cache, partial
+from itertools import islice, zip_longest
+from logging.handlers import RotatingFileHandler
 from typing import List, Dict, Any
-from scraper.playwright_extractor import PlaywrightPriceExtractor
+from urllib.parse import urlparse
+from scraper.playwright_extractor import get_extractor
+from scraper.cse_cache import get_cached_page, cache_page
+
+try:
+    import ahocorasick  # pyahocorasick: one linear pass per title for every keyword
+except ImportError:
+    ahocorasick = None
+
+try:
+    import hyperscan  # SIMD multi-literal matcher for the generic URL reject list
+except ImportError:
+    hyperscan = None
+
+try:
+    import numpy as np  # vectorised random fields for simulated results
+    _RNG = np.random.default_rng()
+except ImportError:
+    np = None
+
+log = logging.getLogger(__name__)
+
+# Scraper logs (this module and direct_scraper) go to a rotating file once get_scraper() runs;
+# dot-prefixed so writes don't trigger Flask's reloader
+SCRAPER_LOG_FILE = 'data/.scraper.log'
+
+# SCRAPER_DEBUG=1 enables the per-item filter/price traces (also echoed to stderr);
+# otherwise each of them costs a single level check
+SCRAPER_DEBUG = os.getenv('SCRAPER_DEBUG', '0') == '1'
+if SCRAPER_DEBUG:
+    logging.getLogger('scraper').setLevel(logging.DEBUG)
+
+# Transient CSE server errors are retried (with backoff) before a page counts as failed
+CSE_RETRY_STATUSES = {500, 502, 503, 504}
+CSE_RETRIES = 2
+
+# Filter vocabulary for CSE results, built once at import instead of per search/item
+_IGNORE_WORDS = frozenset({'for', 'the', 'with', 'and', 'buy', 'price', 'online', 'in', 'at', 'under', 'graphics', 'card', 'edition', 'series'})
+_LISTING_KW = ('all models', 'best', 'deals', 'shop')
+_NEG_KW = ('case', 'cover', 'screen protector', 'guard', 'tempered glass', 'skin', 'sticker', 'stand', 'fan', 'mount')
+_CATEGORIES = {
+    'laptop': ('laptop', 'notebook', 'macbook'),
+    'mobile': ('mobile', 'phone', 'smartphone', 'android', 'iphone'),
+    'phone': ('mobile', 'phone', 'smartphone', 'android', 'iphone'),
+    'monitor': ('monitor', 'display', 'screen'),
+    'watch': ('watch',),
+    'tv': ('tv', 'television'),
+    'shoe': ('shoe', 'sneaker', 'boot', 'sandal'),
+}
+_ACCESSORY_KW = ('cover', 'case', 'guard', 'protector', 'battery', 'glass', 'skin', 'stand', 'mount')
+_ACCESSORY_PHRASES = _ACCESSORY_KW + ('compatible with', 'fits')
+_RETAILER_CATEGORY_PATTERNS = ('/l/', '/bc/', '/c/', 'category', 'accessories/c')
+_URL_REJECT_PATTERNS = ('/s?', 'search', 'category', 'categories', 'collections', '/browse', '/shop/c/', '/catalog')
+_RETAILER_CATEGORY_RE = re.compile('|'.join(map(re.escape, _RETAILER_CATEGORY_PATTERNS)))
+_URL_REJECT_RE = re.compile('|'.join(map(re.escape, _URL_REJECT_PATTERNS)))
+
+# Product-page rules per retailer, dispatched on the URL's host (other hosts: _URL_REJECT_RE)
+_SITE_HOST_KEYS = ('amazon', 'flipkart', 'croma', 'reliance', 'tatacliq')
+_PRODUCT_URL_CHECKS = {
+    # Amazon: Must have /dp/ or /gp/product/
+    'amazon': lambda url: '/dp/' in url or '/gp/product/' in url,
+    # Flipkart: Must have /p/ or /itm
+    'flipkart': lambda url: '/p/' in url or '/itm' in url,
+    # Croma/Reliance: reject category pages (/l/, /bc/, /c/), allow product pages
+    'croma': lambda url: not _RETAILER_CATEGORY_RE.search(url),
+    'reliance': lambda url: not _RETAILER_CATEGORY_RE.search(url),
+}
+
+def _build_reject_db():
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[re.escape(p).encode() for p in _URL_REJECT_PATTERNS],
+        ids=list(range(len(_URL_REJECT_PATTERNS))),
+        flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(_URL_REJECT_PATTERNS)
+    )
+    return db
+
+_URL_REJECT_DB = _build_reject_db() if hyperscan else None
+_hs_local = threading.local()  # scratch space is per scanning thread
+
+def _stop_scan(*args):
+    return True  # any hit rejects the URL
+
+def _is_rejected_url(url_lower: str) -> bool:
+    """True if a lowercased URL contains any generic listing/search pattern"""
+    if _URL_REJECT_DB is None:
+        return _URL_REJECT_RE.search(url_lower) is not None
+    scratch = getattr(_hs_local, 'scratch', None)
+    if scratch is None:
+        scratch = _hs_local.scratch = hyperscan.Scratch(_URL_REJECT_DB)
+    try:
+        _URL_REJECT_DB.scan(url_lower.encode(), match_event_handler=_stop_scan, scratch=scratch)
+    except hyperscan.ScanTerminated:
+        return True
+    return False
+
+@lru_cache(maxsize=512)
+def _site_of(host: str) -> str:
+    """Retailer a hostname belongs to ('web' for any other site)"""
+    return next((site for site in _SITE_HOST_KEYS if site in host), 'web')
+
+def _url_site(url: str) -> str:
+    return _site_of(urlparse(url).hostname or '')
+
+def _build_title_automaton():
+    """One automaton over every title keyword: word -> (word, is_listing, is_negative, is_accessory, categories)"""
+    kinds = {}
+    def entry(word):
+        return kinds.setdefault(word, [False, False, False, set()])
+    for word in _LISTING_KW:
+        entry(word)[0] = True
+    for word in _NEG_KW:
+        entry(word)[1] = True
+    for word in _ACCESSORY_PHRASES:
+        entry(word)[2] = True
+    for cat, synonyms in _CATEGORIES.items():
+        for syn in synonyms:
+            entry(syn)[3].add(cat)
+    
+    automaton = ahocorasick.Automaton()
+    for word, (is_listing, is_negative, is_accessory, cats) in kinds.items():
+        automaton.add_word(word, (word, is_listing, is_negative, is_accessory, frozenset(cats)))
+    automaton.make_automaton()
+    return automaton
+
+_TITLE_AC = _build_title_automaton() if ahocorasick else None
+
+def _scan_title(title: str):
+    """Classify a lowercased title in one pass.
+    
+    Returns (has listing keyword, negative words standing as whole space-separated words,
+    categories whose synonyms appear, has accessory keyword).
+    """
+    if _TITLE_AC is None:
+        return (any(word in title for word in _LISTING_KW),
+                {word for word in _NEG_KW if f" {word} " in f" {title} "},
+                {cat for cat, synonyms in _CATEGORIES.items() if any(syn in title for syn in synonyms)},
+                any(word in title for word in _ACCESSORY_PHRASES))
+    
+    listing = accessory = False
+    negatives, categories = set(), set()
+    for end, (word, is_listing, is_negative, is_accessory, cats) in _TITLE_AC.iter(title):
+        listing = listing or is_listing
+        accessory = accessory or is_accessory
+        categories |= cats
+        if is_negative:
+            start = end - len(word) + 1
+            if (start == 0 or title[start - 1] == ' ') and (end + 1 == len(title) or title[end + 1] == ' '):
+                negatives.add(word)
+    return listing, negatives, categories, accessory
+
+# Placeholder (rating, reviews) pairs for results CSE has no rating for, drawn a batch at a time
+_FAKE_RATINGS_BATCH = 512
+_fake_ratings = iter(())
+
+def _fake_rating_reviews():
+    global _fake_ratings
+    pair = next(_fake_ratings, None)
+    if pair is not None:
+        return pair
+    if np is None:
+        return round(random.uniform(3.5, 5.0), 1), random.randint(50, 5000)
+    ratings = np.round(_RNG.uniform(3.5, 5.0, _FAKE_RATINGS_BATCH), 1).tolist()
+    reviews = _RNG.integers(50, 5000, _FAKE_RATINGS_BATCH, endpoint=True).tolist()
+    _fake_ratings = zip(ratings, reviews)
+    return next(_fake_ratings)
+
+# Price candidates in CSE titles/snippets, all shapes in one left-to-right pass (see _extract_price_smart):
+# 1) currency/label-prefixed amounts, 2) comma-grouped numbers, 3) plain 3-6 digit numbers
+_SNIPPET_PRICE_RE = re.compile(
+    r'(?:Rs\.?|₹|INR|MRP|price|cost)\s*[:\-]?\s*(\d[\d,]*(?:\.\d{2})?)'
+    r'|\b(\d{1,3}(?:,\d{3})+(?:\.\d{2})?)\b'
+    r'|\b(\d{3,6})\b',
+    re.IGNORECASE
+)
+_STRIP_COMMAS = str.maketrans('', '', ',')
 
 class ScraperProvider:
     def search(self, query: str, budget: float, sources: List[str]) -> List[Dict[str, Any]]:
         raise NotImplementedError
+    
+    def search_all(self, query: str, sources=('amazon', 'flipkart'), count: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+        """{source: results} from each site's search_<source>, one after another"""
+        return {name: getattr(self, f'search_{name}')(query, count=count) for name in sources}
 
 class SimulationScraper(ScraperProvider):
+    def __init__(self, count: int = 5):
+        self.count = count  # results per search (raise for load tests)
+
     def search(self, query: str, budget: float, sources: List[str]) -> List[Dict[str, Any]]:
         print(f"Simulating results for {query}...")
-        results = []
-        for i in range(5):
-             price = budget * (1 - random.uniform(0.05, 0.2))
-             results.append({
-                 'name': f"Simulated {query} {i+1}",
-                 'price': int(price),
-                 'rating': round(random.uniform(3.5, 5.0), 1),
-                 'reviews': random.randint(50, 5000),
-                 'source': random.choice(sources) if sources else 'amazon',
-                 'url': f"http://mock-url-{i}.com",
-                 'timestamp': '2024-01-01'
-             })
-        return results
+        n = self.count
+        if np is not None:
+            # One RNG call per field instead of one per field per result
+            prices = (budget * (1 - _RNG.uniform(0.05, 0.2, n))).astype(np.int64).tolist()
+            ratings = np.round(_RNG.uniform(3.5, 5.0, n), 1).tolist()
+            reviews = _RNG.integers(50, 5000, n, endpoint=True).tolist()
+            picked = [sources[i] for i in _RNG.integers(0, len(sources), n)] if sources else ['amazon'] * n
+        else:
+            prices = [int(budget * (1 - random.uniform(0.05, 0.2))) for _ in range(n)]
+            ratings = [round(random.uniform(3.5, 5.0), 1) for _ in range(n)]
+            reviews = [random.randint(50, 5000) for _ in range(n)]
+            picked = [random.choice(sources) if sources else 'amazon' for _ in range(n)]
+        
+        return [{
+            'name': f"Simulated {query} {i+1}",
+            'price': prices[i],
+            'rating': ratings[i],
+            'reviews': reviews[i],
+            'source': picked[i],
+            'url': f"http://mock-url-{i}.com",
+            'timestamp': '2024-01-01'
+        } for i in range(n)]
+
+class _RotatingKeyAuth(httpx.Auth):
+    """Signs CSE requests with the scraper's current API key; on 429 (quota) rotates to the next key and resends"""
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+
+    def auth_flow(self, request):
+        scraper = self.scraper
+        for _ in range(len(scraper.api_keys)):
+            key_index = scraper.current_key_index
+            request.url = request.url.copy_set_param('key', scraper.api_keys[key_index])
+            response = yield request
+            if response.status_code != 429:
+                return
+            # Pages in flight together hit the same exhausted key - only the first 429 rotates it
+            if scraper.current_key_index == key_index:
+                print(f"API Key #{key_index + 1} quota exceeded. Rotating...")
+                scraper.current_key_index = (key_index + 1) % len(scraper.api_keys)
+        print("All API keys exhausted. Stopping search.")
 
 class ProgrammableSearchEngineScraper(ScraperProvider):
     def __init__(self, api_key: str, cx: str):
@@ -42,26 +263,24 @@ class ProgrammableSearchEngineScraper(ScraperProvider):
             else:
                 break
         
-        print(f"DEBUG: Loaded {len(self.api_keys)} Google API key(s) for rotation")
+        log.debug("Loaded %d Google API key(s) for rotation", len(self.api_keys))
         self.cx = cx
         self.url = "https://www.googleapis.com/customsearch/v1"
         self.current_key_index = 0
+        self._loop = None
+        self._client = None  # pooled, kept alive across pages and searches
         
         # Playwright price extractor for EXACT prices
-        self.price_extractor = PlaywrightPriceExtractor()
+        self.price_extractor = get_extractor()  # shared: at most one price browser per process
         self.use_selenium_prices = True  # Using Playwright for exact prices
         self.selenium_failures = 0
         self.max_selenium_failures = 5  # More tolerance for Playwright
 
-    def search(self, query: str, budget: float, sources: List[str]) -> List[Dict[str, Any]]:
+    def search(self, query: str, budget: float, sources: List[str], refresh: bool = False) -> List[Dict[str, Any]]:
+        """refresh=True skips the on-disk CSE page cache and refetches every page"""
         start_time = time.time()
-        
-        # Write to log file since terminal prints don't show
-        # with open('scraper_log.txt', 'w', encoding='utf-8') as f:
-        #     f.write(f"SEARCH STARTED: {query}\n")
-        #     f.write(f"Budget: {budget}\n")
-        #     f.write(f"Sources: {sources}\n")
-        #     f.write(f"use_selenium_prices: {self.use_selenium_prices}\n")
+        log.debug("Search started: %r (budget %s, sources %s, browser prices %s)",
+                  query, budget, sources, self.use_selenium_prices)
         
         print(f"Scraping using Programmable Search Engine for '{query}'...")
         
@@ -89,52 +308,7 @@ class ProgrammableSearchEngineScraper(ScraperProvider):
 
         # TIMING: API Calls
         api_start = time.time()
-        items = []
-        for batch in query_batches:
-            search_query = batch['q']
-            for page in range(batch['pages']):
-                start_index = (page * 10) + 1
-                
-                # Try with key rotation on quota errors
-                success = False
-                for attempt in range(len(self.api_keys)):
-                    current_key = self.api_keys[self.current_key_index]
-                    params = {
-                        'key': current_key,
-                        'cx': self.cx,
-                        'q': search_query,
-                        'num': 10,
-                        'start': start_index,
-                        'gl': 'in',
-                        'cr': 'countryIN'
-                    }
-                    
-                    try:
-                        response = requests.get(self.url, params=params)
-                        response.raise_for_status()
-                        data = response.json()
-                        page_items = data.get('items', [])
-                        if not page_items: break
-                        items.extend(page_items)
-                        success = True
-                        break  # Success, exit retry loop
-                    except requests.exceptions.HTTPError as e:
-                        if e.response.status_code == 429:  # Quota exceeded
-                            print(f"API Key #{self.current_key_index + 1} quota exceeded. Rotating...")
-                            self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-                            if attempt == len(self.api_keys) - 1:
-                                print("All API keys exhausted. Stopping search.")
-                                break
-                            continue  # Try next key
-                        else:
-                            print(f"CSE API Error: {e}")
-                            break
-                    except Exception as e:
-                        print(f"CSE API Error: {e}")
-                        break
-                
-                if not success:
-                    break  # Stop pagination if all keys failed
+        items = self._run(self._fetch_items(query_batches, refresh))
 
         api_time = time.time() - api_start
         print(f"⏱️ API Calls took: {api_time:.2f}s ({len(items)} items)")
@@ -142,142 +316,50 @@ class ProgrammableSearchEngineScraper(ScraperProvider):
         # TIMING: Filtering
         filter_start = time.time()
         
-        ignore_words = {'for', 'the', 'with', 'and', 'buy', 'price', 'online', 'in', 'at', 'under', 'graphics', 'card', 'edition', 'series'}
-        query_keywords = [w for w in query.lower().split() if w not in ignore_words and len(w) > 1]
+        q_lower = query.lower()
+        query_keywords = [w for w in q_lower.split() if w not in _IGNORE_WORDS and len(w) > 1]
         
         # If strict category match exists (e.g. 'laptop'), we can trust the result more
         # so we rely less on keyword overlap density
         strict_category_found = False
         
-        if not query_keywords: query_keywords = query.lower().split()
+        if not query_keywords: query_keywords = q_lower.split()
         
-        scored_products = []
-
-        for item in items:
-            title = item.get('title', '')
-            link = item.get('link', '')
-            snippet = item.get('snippet', '')
-            pagemap = item.get('pagemap', {})
-            
-            # URL Filter - Only specific product pages
-            if not self._is_product_url(link):
-                # print(f"DEBUG [URL Filter]: {title[:50]}... | Source: {link[:70]}")
-                continue
-            
-            # Title Filter - Reject Listing/Category Pages
-            # e.g. "Best Laptops", "Asus All Models", "Gaming Deals"
-            listing_keywords = ['deals', 'best', 'top', 'all models', 'series', 'collection', 'store', 'shop', 'online', 'price list']
-            if any(lk in title.lower() for lk in listing_keywords) and not any(x in title.lower() for x in ['loq', 'tuf', 'rog', 'legion', 'predator', 'alienware', 'pavilion', 'victus', 'ideapad']):
-                 # Allow if it contains specific model names (LOQ, TUF, etc) even if it says "Online"
-                 # But "All Models" should definitely be rejected.
-                 pass
-            
-            if "all models" in title.lower() or "best" in title.lower() or "deals" in title.lower() or "shop" in title.lower():
-                 # Strict rejection for obvious listing titles
-                 # print(f"DEBUG [Title Filter]: Rejected listing '{title[:40]}...'")
-                 continue
-
-            title_lower = title.lower()
-            q_lower = query.lower()
-
-            # --- STRICT FILTERING ---
-            # 1. Negative Filter (Accessories)
-            negatives = ['case', 'cover', 'screen protector', 'guard', 'tempered glass', 'skin', 'sticker', 'stand', 'fan', 'mount']
-            should_exclude = False
-            for neg in negatives:
-                 if neg in title_lower and neg not in q_lower:
-                     # Check word boundaries roughly
-                     if f" {neg} " in f" {title_lower} " or title_lower.startswith(f"{neg} ") or title_lower.endswith(f" {neg}"):
-                         should_exclude = True
-                         break
-            if should_exclude: continue
-
-            # 2. Mandatory Category Check
-            categories = {
-                'laptop': ['laptop', 'notebook', 'macbook'],
-                'mobile': ['mobile', 'phone', 'smartphone', 'android', 'iphone'],
-                'phone': ['mobile', 'phone', 'smartphone', 'android', 'iphone'],
-                'monitor': ['monitor', 'display', 'screen'],
-                'watch': ['watch'],
-                'tv': ['tv', 'television'],
-                'shoe': ['shoe', 'sneaker', 'boot', 'sandal'],
-            }
-            excluded_cat = False
-            for cat, synonyms in categories.items():
-                 if cat in q_lower:
-                     if not any(syn in title_lower for syn in synonyms):
-                         excluded_cat = True
-                         break
-            if excluded_cat: continue
-            # ------------------------
-            
-            # Relevance scoring
-            match_count = sum(1 for k in query_keywords if k in title_lower)
-            match_ratio = match_count / len(query_keywords) if query_keywords else 0
-            
-            # Accessory filter
-            accessory_kw = ['cover', 'case', 'guard', 'protector', 'battery', 'glass', 'skin', 'stand', 'mount']
-            is_accessory = any(x in title_lower for x in accessory_kw) or "compatible with" in title_lower or "fits" in title_lower
-            query_is_accessory = any(x in k for k in query_keywords for x in accessory_kw)
-            if is_accessory and not query_is_accessory: continue
-
-            # Require reasonable match (lowered for more results)
-            if match_ratio < 0.15:  # 15% keyword match minimum
-                print(f"DEBUG [Relevance]: Rejected {title[:40]}... (match: {match_ratio:.2f})")
-                continue
-            
-            relevance_score = match_ratio * 10
-            if query.lower() in title_lower: relevance_score += 5
-            
-            # PRICE EXTRACTION - Try CSE first, then Selenium
-            price, price_source = self._extract_price_smart(pagemap, snippet, title, budget)
+        required_categories = [cat for cat in _CATEGORIES if cat in q_lower]
+        query_is_accessory = any(x in k for k in query_keywords for x in _ACCESSORY_KW)
+        
+        score = partial(self._score_item, q_lower=q_lower, query_keywords=query_keywords, budget=budget,
+                        required_categories=required_categories, query_is_accessory=query_is_accessory)
+        # Inline: at most 40 items per search, too few to repay shipping them to worker processes
+        scored = map(score, items)
+        
+        candidates = []  # items that passed the filters, priced below
+        needs_browser = []  # candidates the snippet gave no price for
+        for c in scored:
+            if c is None: continue
             
-            # If CSE extraction failed, use Selenium to get REAL price from HTML
-            if (price == 0.0 or price_source != 'extracted') and self.use_selenium_prices:
-                print(f"DEBUG [Selenium]: Getting real price for {title[:40]}...")
-                source_name = 'amazon' if 'amazon' in link else ('flipkart' if 'flipkart' in link else 'croma')
-                
-                try:
-                    price = self.price_extractor.extract_price(link, source_name)
-                    if price > 0:
-                        price_source = 'selenium'
-                        self.selenium_failures = 0  # Reset on success
-                        print(f"DEBUG [Selenium]: Found ₹{price} for {title[:30]}")
-                    else:
-                        self.selenium_failures += 1
-                        print(f"DEBUG [Selenium]: Failed to extract price ({self.selenium_failures}/{self.max_selenium_failures})")
-                        
-                        # Auto-disable Selenium if failing too much (bot detection likely)
-                        if self.selenium_failures >= self.max_selenium_failures:
-                            print("⚠️ WARNING: Selenium disabled due to repeated failures (likely bot detection)")
-                            print("⚠️ Falling back to CSE-only mode (prices may be less accurate)")
-                            self.use_selenium_prices = False
-                        continue
-                except Exception as e:
-                    self.selenium_failures += 1
-                    print(f"DEBUG [Selenium]: Error - {str(e)[:50]} ({self.selenium_failures}/{self.max_selenium_failures})")
-                    
-                    if self.selenium_failures >= self.max_selenium_failures:
-                        print("⚠️ WARNING: Selenium disabled - switching to CSE-only mode")
-                        self.use_selenium_prices = False
-                    continue
-            elif price == 0.0:
-                print(f"DEBUG [Price]: Rejected {title[:40]}... - No extractable price")
+            # If CSE extraction failed, the browser gets the REAL price from HTML (one batch, below)
+            if (c['price'] == 0.0 or c['price_source'] != 'extracted') and self.use_selenium_prices:
+                needs_browser.append(len(candidates))
+            elif c['price'] == 0.0:
+                log.debug("[Price] Rejected %s... - No extractable price", c['title'][:40])
                 continue
+            candidates.append(c)
+        
+        if needs_browser:
+            self._fetch_browser_prices([candidates[i] for i in needs_browser])
+        
+        scored_products = []
+        for c in candidates:
+            title, link, price, price_source = c['title'], c['link'], c['price'], c['price_source']
+            if price == 0.0: continue  # the browser found no price either
             
             # Budget sanity check
             if budget > 0:
                  if price > budget * 1.5: continue
                  if price < budget * 0.05: continue
 
-            rating, reviews = self._extract_rating_reviews(pagemap, snippet)
-            
-            source = 'web'
-            if 'amazon' in link: source = 'amazon'
-            elif 'flipkart' in link: source = 'flipkart'
-            elif 'croma' in link: source = 'croma'
-            elif 'reliance' in link: source = 'reliance'
-            elif 'tatacliq' in link: source = 'tatacliq'
+            rating, reviews = self._extract_rating_reviews(c['pagemap'], c['snippet'])
             
             # Append price source indicator if estimated
             if price_source == 'estimated':
@@ -288,82 +370,206 @@ class ProgrammableSearchEngineScraper(ScraperProvider):
                 'price': round(price, 2),
                 'rating': rating,
                 'reviews': reviews,
-                'source': source,
+                'source': c['site'],
                 'url': link,
                 'timestamp': 'now',
-                '_score': relevance_score
+                '_score': c['score']
             })
         
-        # Deduplicate
+        # Deduplicate and group by source for diversity, in one pass
         seen_urls = set()
-        unique = []
+        grouped = defaultdict(list)
         for p in scored_products:
             if p['url'] not in seen_urls:
-                unique.append(p)
                 seen_urls.add(p['url'])
+                grouped[p['source']].append(p)
         
-        # Group by source for diversity
-        grouped = {}
-        for p in unique:
-            s = p['source']
-            if s not in grouped: grouped[s] = []
-            grouped[s].append(p)
-        
-        # Round-robin selection
-        final = []
-        keys = list(grouped.keys())
-        while len(final) < target_count and keys:
-            for s in list(keys):
-                if grouped[s]:
-                    final.append(grouped[s].pop(0))
-                else:
-                    keys.remove(s)
-                if len(final) >= target_count: break
+        # Round-robin selection: 1st of every source, then 2nd of every source, ... up to target count
+        round_robin = (p for row in zip_longest(*grouped.values()) for p in row if p is not None)
+        final = list(islice(round_robin, target_count))
         
         # Sort by price
-        final.sort(key=lambda x: x['price'])
-        
-        # Limit to target count
-        final = final[:target_count]
+        final.sort(key=operator.itemgetter('price'))
         
         filter_time = time.time() - filter_start
         total_time = time.time() - start_time
         
         print(f"⏱️ Filtering took: {filter_time:.2f}s")
         print(f"⏱️ TOTAL TIME: {total_time:.2f}s")
-        print(f"DEBUG: Returning {len(final)} products (Target: {target_count}).")
+        log.debug("Returning %d products (Target: %d).", len(final), target_count)
         
         return [{k:v for k,v in p.items() if k != '_score'} for p in final]
 
-    def _is_product_url(self, url: str) -> bool:
-        """Only allow specific product pages, reject category/search/listing pages."""
-        url_lower = url.lower()
-        
-        # Amazon: Must have /dp/ or /gp/product/
-        if 'amazon' in url_lower:
-            return '/dp/' in url_lower or '/gp/product/' in url_lower
+    @classmethod
+    def _score_item(cls, item: Dict, q_lower: str, query_keywords: List[str], required_categories: List[str],
+                    query_is_accessory: bool, budget: float):
+        """Filter one CSE item and price it from its snippet/pagemap (None = rejected)"""
+        title = item.get('title', '')
+        link = item.get('link', '')
+        snippet = item.get('snippet', '')
+        pagemap = item.get('pagemap', {})
+        site = _url_site(link)  # retailer, reused as the result's source
+        
+        # URL Filter - Only specific product pages
+        if not cls._is_product_url(link, site):
+            log.debug("[URL Filter] %s... | Source: %s", title[:50], link[:70])
+            return None
+        
+        title_lower = title.lower()
+        is_listing, negatives, title_categories, is_accessory = _scan_title(title_lower)
+        
+        # Title Filter - Reject Listing/Category Pages
+        # e.g. "Best Laptops", "Asus All Models", "Gaming Deals"
+        if is_listing:
+             # Strict rejection for obvious listing titles
+             log.debug("[Title Filter] Rejected listing '%s...'", title[:40])
+             return None
+
+        # --- STRICT FILTERING ---
+        # 1. Negative Filter (Accessories) - whole words the query doesn't ask for
+        if any(neg not in q_lower for neg in negatives): return None
+
+        # 2. Mandatory Category Check
+        if any(cat not in title_categories for cat in required_categories): return None
+        # ------------------------
+        
+        # Relevance scoring
+        match_count = sum(1 for k in query_keywords if k in title_lower)
+        match_ratio = match_count / len(query_keywords) if query_keywords else 0
+        
+        # Accessory filter
+        if is_accessory and not query_is_accessory: return None
+
+        # Require reasonable match (lowered for more results)
+        if match_ratio < 0.15:  # 15% keyword match minimum
+            log.debug("[Relevance] Rejected %s... (match: %.2f)", title[:40], match_ratio)
+            return None
+        
+        relevance_score = match_ratio * 10
+        if q_lower in title_lower: relevance_score += 5
+        
+        # PRICE EXTRACTION - Try CSE first, then Selenium
+        price, price_source = cls._extract_price_smart(pagemap, snippet, title, budget)
+        
+        return {'title': title, 'link': link, 'site': site, 'snippet': snippet, 'pagemap': pagemap,
+                'price': price, 'price_source': price_source, 'score': relevance_score}
+
+    def _fetch_browser_prices(self, candidates):
+        """Fill in each candidate's price from its product page, all pages in one parallel batch (0.0 = not found)"""
+        log.debug("[Selenium] Getting real prices for %d items...", len(candidates))
+        jobs = [(c['link'], c['site'] if c['site'] in ('amazon', 'flipkart') else 'croma') for c in candidates]
+        try:
+            prices = self.price_extractor.extract_prices(jobs)
+        except Exception as e:
+            log.debug("[Selenium] Error - %.50s", e)
+            prices = [0.0] * len(candidates)
+        
+        for c, price in zip(candidates, prices):
+            c['price'] = price
+            if price > 0:
+                c['price_source'] = 'selenium'
+                self.selenium_failures = 0  # Reset on success
+                log.debug("[Selenium] Found ₹%s for %s", price, c['title'][:30])
+            else:
+                self.selenium_failures += 1
+                log.debug("[Selenium] Failed to extract price (%d/%d)", self.selenium_failures, self.max_selenium_failures)
+                
+                # Auto-disable Selenium if failing too much (bot detection likely)
+                if self.selenium_failures >= self.max_selenium_failures and self.use_selenium_prices:
+                    print("⚠️ WARNING: Selenium disabled due to repeated failures (likely bot detection)")
+                    print("⚠️ Falling back to CSE-only mode (prices may be less accurate)")
+                    self.use_selenium_prices = False
+
+    def _run(self, coro):
+        """Run a coroutine on this scraper's private loop"""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=4),
+                transport=httpx.AsyncHTTPTransport(retries=2),  # retries failed connects
+                auth=_RotatingKeyAuth(self),
+                timeout=httpx.Timeout(10.0, connect=3.0)
+            )
+        return self._client
+
+    async def _fetch_items(self, query_batches, refresh: bool = False) -> list:
+        """CSE results of every page of every batch, fetched concurrently and kept in page order"""
+        batches = await asyncio.gather(*(
+            asyncio.gather(*(self._fetch_page(batch['q'], (page * 10) + 1, refresh) for page in range(batch['pages'])))
+            for batch in query_batches
+        ))
         
-        # Flipkart: Must have /p/ or /itm
-        if 'flipkart' in url_lower:
-            return '/p/' in url_lower or '/itm' in url_lower
+        items = []
+        for pages in batches:
+            for page_items in pages:
+                if not page_items: break  # Pagination ends at the first empty/failed page
+                items.extend(page_items)
+        return items
+
+    async def _get(self, params: dict) -> httpx.Response:
+        """GET the CSE endpoint, retrying 5xx answers with backoff"""
+        for retry in range(CSE_RETRIES + 1):
+            response = await self._get_client().get(self.url, params=params)
+            if response.status_code not in CSE_RETRY_STATUSES or retry == CSE_RETRIES:
+                return response
+            await asyncio.sleep(0.3 * 2 ** retry)
+
+    async def _fetch_page(self, search_query: str, start_index: int, refresh: bool = False) -> list:
+        """One CSE results page, rotating keys on quota errors ([] if empty or every key failed)"""
+        if not refresh:
+            cached = get_cached_page(search_query, start_index)
+            if cached is not None:
+                return cached
         
-        # Croma/Reliance: Allow product pages, reject category/listing pages
-        if 'croma' in url_lower or 'reliance' in url_lower:
-            # Reject category pages (/l/, /bc/, /c/)
-            if any(x in url_lower for x in ['/l/', '/bc/', '/c/', 'category', 'accessories/c']):
-                return False
-            # Allow actual product pages (usually have product name in URL)
-            return True
+        params = {
+            'cx': self.cx,
+            'q': search_query,
+            'num': 10,
+            'start': start_index,
+            'gl': 'in',
+            'cr': 'countryIN'
+        }  # 'key' is added by _RotatingKeyAuth
         
-        # Generic: Reject obvious listing/category/search pages
-        reject_patterns = ['/s?', 'search', 'category', 'categories', 'collections', '/browse', '/shop/c/', '/catalog']
-        if any(x in url_lower for x in reject_patterns):
-            return False
+        try:
+            response = await self._get(params)
+            response.raise_for_status()
+            return cache_page(search_query, start_index, response.json().get('items', []))
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 429:  # 429 = every key exhausted, already reported
+                print(f"CSE API Error: {e}")
+        except Exception as e:
+            print(f"CSE API Error: {e}")
+        return []
+
+    def close(self):
+        """Close the pooled CSE client and the private loop"""
+        if self._loop is not None:
+            if self._client is not None:
+                self._run(self._client.aclose())
+                self._client = None
+            self._loop.close()
+            self._loop = None
+
+    @staticmethod
+    def _is_product_url(url: str, site: str = None) -> bool:
+        """Only allow specific product pages, reject category/search/listing pages.
+        
+        `site` is the URL's _url_site() if the caller already has it.
+        """
+        url_lower = url.lower()
+        check = _PRODUCT_URL_CHECKS.get(site or _url_site(url_lower))
+        if check:
+            return check(url_lower)
         
-        # Allow other e-commerce sites
-        return True
+        # Generic: Reject obvious listing/category/search pages, allow other e-commerce sites
+        return not _is_rejected_url(url_lower)
 
-    def _extract_price_smart(self, pagemap: Dict, snippet: str, title: str, budget: float) -> tuple:
+    @classmethod
+    def _extract_price_smart(cls, pagemap: Dict, snippet: str, title: str, budget: float) -> tuple:
         """
         Extract price with NO fallback estimation.
         Returns: (price, source) where source = 'extracted' | 'failed'
@@ -377,37 +583,21 @@ class ProgrammableSearchEngineScraper(ScraperProvider):
         for offer in offers:
             price_str = offer.get('price')
             if price_str:
-                p = self._parse_price(str(price_str))
+                p = cls._parse_price(str(price_str))
                 if p > 0:
                     return p, 'extracted'
         
-        # Extract all price-like numbers with VERY aggressive patterns
-        candidates = []
-        
-        # Pattern 1: Currency symbols (₹500, Rs. 1,000, $50, INR 1,234)
-        p1 = r'(?:Rs\.?|₹|INR|MRP)\s*[:\-]?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
-        candidates.extend(re.findall(p1, search_text, re.IGNORECASE))
-        
-        # Pattern 2: "Price: 599" or "₹ 599"
-        p2 = r'(?:price|cost|₹|rs)\s*[:\-]?\s*(\d{3,6})'
-        candidates.extend(re.findall(p2, search_text, re.IGNORECASE))
-        
-        # Pattern 3: Standalone numbers with commas (14,999 or 1,234.00)
-        p3 = r'\b(\d{1,3}(?:,\d{3})+(?:\.\d{2})?)\b'
-        candidates.extend(re.findall(p3, search_text))
-        
-        # Pattern 4: Plain 3-6 digit numbers that look like prices
-        p4 = r'\b(\d{3,6})\b'
-        plain_nums = re.findall(p4, search_text)
-        # Only add if they're likely prices (not years, ratings, etc.)
-        for num in plain_nums:
-            n = int(num)
-            if 100 < n < 100000:  # Likely a price range
-                candidates.append(num)
-        
+        # Extract all price-like numbers with VERY aggressive patterns:
+        # ₹500, Rs. 1,000, INR 1,234, "Price: 599", standalone 14,999 / 1,234.00, plain 3-6 digits
         valid_prices = []
-        for c in candidates:
-            p = self._parse_price(c)
+        for m in _SNIPPET_PRICE_RE.finditer(search_text):
+            prefixed, grouped, plain = m.groups()
+            if plain is not None:
+                p = float(plain)
+                # Only plain numbers in a likely price range (not ratings, model numbers, etc.)
+                if not 100 < p < 100000: continue
+            else:
+                p = float((prefixed or grouped).translate(_STRIP_COMMAS))
             # Filter obvious years or tiny numbers
             if 2020 <= p <= 2030: continue
             if p < 50: continue
@@ -444,9 +634,10 @@ class ProgrammableSearchEngineScraper(ScraperProvider):
             if r and c:
                 try: return float(r), int(c)
                 except: pass
-        return round(random.uniform(3.5, 5.0), 1), random.randint(50, 5000)
+        return _fake_rating_reviews()
 
-    def _parse_price(self, price_str: str) -> float:
+    @staticmethod
+    def _parse_price(price_str: str) -> float:
         try:
             cleaned = price_str.replace(',', '').replace('₹', '').replace('Rs', '').replace('$', '').replace('INR', '').strip()
             return float(cleaned)
@@ -596,9 +787,26 @@ class SerpApiScraper(ScraperProvider):
             print(f"[SerpAPI] Error: {e}")
             return []
 
+def _configure_logging():
+    """Attach the rotating scraper log file (and stderr under SCRAPER_DEBUG) to the package logger, once per process"""
+    package_log = logging.getLogger('scraper')
+    if any(isinstance(h, RotatingFileHandler) for h in package_log.handlers):
+        return
+    if multiprocessing.parent_process() is not None:
+        return  # pool workers: only the main process writes (and rotates) the log file
+    os.makedirs(os.path.dirname(SCRAPER_LOG_FILE), exist_ok=True)
+    handler = RotatingFileHandler(SCRAPER_LOG_FILE, maxBytes=1 << 20, backupCount=3, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(levelname)s %(message)s'))
+    package_log.addHandler(handler)
+    if SCRAPER_DEBUG:
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter('DEBUG [%(name)s] %(message)s'))
+        package_log.addHandler(console)
+
 def get_scraper():
     from dotenv import load_dotenv
     load_dotenv()
+    _configure_logging()
 
     # 1. DirectSearchScraper — PRIMARY (Playwright scrapes Amazon/Flipkart directly, more results)
     try:
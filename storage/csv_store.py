@@ -1,9 +1,28 @@
 import csv
+import hashlib
 import os
+import tempfile
 from typing import List, Dict, Any
 
+try:
+    import xxhash  # fast 64-bit hash for product ids
+except ImportError:
+    xxhash = None
+
 PRODUCTS_FILE = 'data/.products.csv'
 HISTORY_FILE = 'data/.negotiation_history.csv'
+PRODUCT_FIELDS = ['id', 'query', 'name', 'price', 'source', 'url', 'active', 'timestamp']
+
+def product_id(url: str) -> int:
+    """Id derived from the URL, stable across processes (unlike hash(), which is salted per run).
+    
+    Kept to 63 bits so it fits a signed SQLite INTEGER.
+    """
+    if xxhash is not None:
+        digest = xxhash.xxh3_64_intdigest(url.encode())
+    else:
+        digest = int.from_bytes(hashlib.blake2b(url.encode(), digest_size=8).digest(), 'big')
+    return digest >> 1
 
 class CSVStore:
     def __init__(self):
@@ -16,7 +35,7 @@ class CSVStore:
         if not os.path.exists(PRODUCTS_FILE):
             with open(PRODUCTS_FILE, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
-                writer.writerow(['id', 'query', 'name', 'price', 'source', 'url', 'active', 'timestamp'])
+                writer.writerow(PRODUCT_FIELDS)
 
         if not os.path.exists(HISTORY_FILE):
             with open(HISTORY_FILE, 'w', newline='', encoding='utf-8') as f:
@@ -24,21 +43,12 @@ class CSVStore:
                 writer.writerow(['timestamp', 'product_id', 'buyer_offer', 'seller_response', 'status', 'round'])
 
     def save_products(self, products: List[Dict[str, Any]], query: str):
-        # Read existing to handle upsert
-        existing = {}
-        if os.path.exists(PRODUCTS_FILE):
-            with open(PRODUCTS_FILE, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    existing[row['url']] = row
-
         # Mark products from same query as inactive if not in new list?
         # For now, just upsert.
-        
-        current_urls = set()
+        new_rows = {}
         for p in products:
-            p_data = {
-                'id': p.get('id') or abs(hash(p['url'])),
+            new_rows[p['url']] = {
+                'id': p.get('id') or product_id(p['url']),
                 'query': query,
                 'name': p['name'],
                 'price': p['price'],
@@ -47,16 +57,23 @@ class CSVStore:
                 'active': 'true',
                 'timestamp': p.get('timestamp', '')
             }
-            existing[p['url']] = p_data
-            current_urls.add(p['url'])
 
-        # Write back
-        with open(PRODUCTS_FILE, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['id', 'query', 'name', 'price', 'source', 'url', 'active', 'timestamp']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for url, data in existing.items():
-                writer.writerow(data)
+        # Stream existing rows into a temp file, swapping in updated ones, then
+        # atomically replace the original (only the new rows are held in memory)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(PRODUCTS_FILE), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=PRODUCT_FIELDS)
+                writer.writeheader()
+                if os.path.exists(PRODUCTS_FILE):
+                    with open(PRODUCTS_FILE, 'r', newline='', encoding='utf-8') as src:
+                        for row in csv.DictReader(src):
+                            writer.writerow(new_rows.pop(row['url'], row))
+                writer.writerows(new_rows.values())
+            os.replace(tmp_path, PRODUCTS_FILE)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
 
     def log_negotiation(self, entry: Dict[str, Any]):
         with open(HISTORY_FILE, 'a', newline='', encoding='utf-8') as f:
@@ -0,0 +1,66 @@
+import csv
+import os
+import sqlite3
+import threading
+from typing import List, Dict, Any
+
+from storage.csv_store import PRODUCTS_FILE, HISTORY_FILE, product_id
+
+# Dot-prefixed like the CSVs it replaces, so writes don't trigger Flask's reloader
+STORE_FILE = 'data/.store.db'
+
+_UPSERT_PRODUCT = '''
+    INSERT INTO products (url, id, query, name, price, source, active, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET
+        id = excluded.id, query = excluded.query, name = excluded.name, price = excluded.price,
+        source = excluded.source, active = excluded.active, timestamp = excluded.timestamp
+'''
+
+class SQLiteStore:
+    """Same interface as CSVStore, backed by one SQLite file: saving upserts only the given rows"""
+
+    def __init__(self, path: str = STORE_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        is_new = not os.path.exists(path)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute('PRAGMA journal_mode=WAL')  # readers don't block the writer
+        with self.conn:
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS products (
+                url TEXT PRIMARY KEY, id INTEGER, query TEXT, name TEXT, price REAL,
+                source TEXT, active INTEGER, timestamp TEXT)''')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS history (
+                timestamp REAL, product_id TEXT, buyer_offer REAL, seller_response TEXT,
+                status TEXT, round INTEGER)''')
+        if is_new:
+            self._import_csv()
+
+    def _import_csv(self):
+        """Carry over data saved by CSVStore"""
+        if os.path.exists(PRODUCTS_FILE):
+            with open(PRODUCTS_FILE, 'r', newline='', encoding='utf-8') as f:
+                rows = [(r['url'], r['id'], r['query'], r['name'], r['price'], r['source'],
+                         int(r['active'] == 'true'), r['timestamp']) for r in csv.DictReader(f)]
+            with self._lock, self.conn:
+                self.conn.executemany(_UPSERT_PRODUCT, rows)
+        if os.path.exists(HISTORY_FILE):
+            with open(HISTORY_FILE, 'r', newline='', encoding='utf-8') as f:
+                rows = [(r['timestamp'], r['product_id'], r['buyer_offer'], r['seller_response'],
+                         r['status'], r['round']) for r in csv.DictReader(f)]
+            with self._lock, self.conn:
+                self.conn.executemany('INSERT INTO history VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def save_products(self, products: List[Dict[str, Any]], query: str):
+        rows = [(p['url'], p.get('id') or product_id(p['url']), query, p['name'], p['price'],
+                 p['source'], 1, p.get('timestamp', '')) for p in products]
+        with self._lock, self.conn:
+            self.conn.executemany(_UPSERT_PRODUCT, rows)
+
+    def log_negotiation(self, entry: Dict[str, Any]):
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO history VALUES (?, ?, ?, ?, ?, ?)',
+                (entry['timestamp'], entry['product_id'], entry['buyer_offer'],
+                 entry['seller_response'], entry['status'], entry['round'])
+            )
@@ -0,0 +1,47 @@
+"""
+Unit Tests for the Direct Scraper's HTML Parsers
+"""
+
+import unittest
+from scraper.direct_scraper import _parse_google_shopping_html
+
+
+# Grid card whose link sits outside the nested content div that holds title and price
+NESTED_CARD = (
+    '<div class="sh-dgr__gr-auto" data-docid="{n}">'
+    '<a href="/url?q=https://www.amazon.in/dp/B0{n}&amp;sa=U"><img src="x.jpg"></a>'
+    '<div class="sh-dgr__content">'
+    '<h3>Phone {n}</h3>'
+    '<div><span class="a8Pemb">₹1{n},999</span></div>'
+    '</div>'
+    '</div>'
+)
+
+
+def _page(cards):
+    return '<html><body><div id="grid">' + ''.join(cards) + '</div></body></html>'
+
+
+class TestGoogleShoppingParser(unittest.TestCase):
+    """Test streaming extraction of Google Shopping cards."""
+
+    def test_nested_cards(self):
+        html = _page(NESTED_CARD.format(n=n) for n in range(3))
+
+        items = _parse_google_shopping_html(html)
+
+        self.assertEqual([i.name for i in items], ['Phone 0', 'Phone 1', 'Phone 2'])
+        self.assertEqual([i.price for i in items], [10999, 11999, 12999])
+        self.assertEqual(items[0].url, 'https://www.amazon.in/dp/B00')
+        self.assertEqual(items[0].source, 'amazon')
+
+    def test_limit(self):
+        html = _page(NESTED_CARD.format(n=n) for n in range(5))
+
+        items = _parse_google_shopping_html(html, limit=2)
+
+        self.assertEqual([i.name for i in items], ['Phone 0', 'Phone 1'])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
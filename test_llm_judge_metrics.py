@@ -38,6 +38,19 @@ class TestConfusionMatrix(unittest.TestCase):
         self.assertEqual(cm['true_negative'], 0)
         self.assertEqual(cm['false_positive'], 2)
         self.assertEqual(cm['false_negative'], 2)
+    
+    def test_length_mismatch(self):
+        y_true = [1, 0, 1]
+        y_pred = [1, 0]
+        
+        with self.assertRaises(ValueError):
+            compute_confusion_matrix(y_true, y_pred)
+    
+    def test_non_binary_labels(self):
+        with self.assertRaises(ValueError):
+            compute_confusion_matrix([1, 0, 2], [1, 0, 1])
+        with self.assertRaises(ValueError):
+            compute_confusion_matrix([1, 0, 1], [1, -1, 1])
 
 
 class TestMetrics(unittest.TestCase):
@@ -134,6 +147,14 @@ class TestClassificationReport(unittest.TestCase):
         self.assertLessEqual(report['precision'], 1.0)
         self.assertGreaterEqual(report['roc_auc'], 0.0)
         self.assertLessEqual(report['roc_auc'], 1.0)
+    
+    def test_length_mismatch(self):
+        y_true = [1, 0, 1, 0]
+        
+        with self.assertRaises(ValueError):
+            compute_classification_report(y_true, [1, 0, 1])
+        with self.assertRaises(ValueError):
+            compute_classification_report(y_true, [1, 0, 1, 0], [0.9, 0.1])
 
 
 if __name__ == "__main__":
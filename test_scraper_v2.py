@@ -11,12 +11,12 @@ def test_scraper():
     query = "Samsung S24 Ultra Cover"
     print(f"🔎 Searching for: {query}")
     
-    results = scraper.search_amazon(query)
-    print(f"Amazon Results: {len(results)}")
-    for p in results:
+    results = scraper.search_all(query)
+    print(f"Amazon Results: {len(results['amazon'])}")
+    for p in results['amazon']:
         print(f" - {p['name'][:50]}... : {p['price']}")
 
-    results_fk = scraper.search_flipkart(query)
+    results_fk = results['flipkart']
     print(f"Flipkart Results: {len(results_fk)}")
     for p in results_fk:
         print(f" - {p['name'][:50]}... : {p['price']}")
@@ -1,94 +1,202 @@
-from playwright.sync_api import sync_playwright
+import asyncio
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 from bs4 import BeautifulSoup
+from lxml.cssselect import CSSSelector
+import lxml.html
+import soupsieve as sv
 import time
+from scraper.direct_scraper import _product_key
+from scraper.fast_price_extractor import FastPriceExtractor
+
+RESULT_SELECTOR = "div.s-main-slot div[data-component-type='s-search-result']"
+PRICE_SELECTOR = "span.a-price-whole"
+MAX_OPEN_PAGES = 5  # product pages fetched at once in the fallback pass
+
+# Compiled once rather than re-parsed by every select_one call in the card loop
+_SEL_CARDS = sv.compile(RESULT_SELECTOR)
+_SEL_LINK = sv.compile("a.a-link-normal.s-no-outline")
+_SEL_WHOLE = sv.compile("span.a-price-whole")
+_SEL_FRAC = sv.compile("span.a-price-fraction")
+# Same spans for product pages fetched over plain HTTP (parsed with lxml, no BeautifulSoup)
+_CSS_WHOLE = CSSSelector("span.a-price-whole")
+_CSS_FRAC = CSSSelector("span.a-price-fraction")
+
+# One browser + context for the whole process, so repeated main() calls skip the launch.
+# Async Playwright objects belong to the loop that created them, hence the private loop.
+_loop = None
+_playwright = None
+_browser = None
+_context = None
+_http = FastPriceExtractor()  # pooled HTTP/2 client for product pages; binds to _loop on first use
+
+def _run(coro):
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+async def _get_context():
+    global _playwright, _browser, _context
+    if _context is None:
+        _playwright = await async_playwright().start()
+        _browser = await _playwright.chromium.launch(headless=True)
+        _context = await _browser.new_context(locale="en-IN")
+    return _context
+
+async def _close():
+    global _playwright, _browser, _context
+    await _http.aclose()
+    if _browser is not None:
+        await _browser.close()
+        await _playwright.stop()
+    _playwright = _browser = _context = None
+
+def close():
+    """Shut the shared browser down"""
+    if _loop is not None:
+        _run(_close())
+
+_STRIP_PRICE = str.maketrans("", "", "₹,")
 
 def clean_price(p):
-    p = p.replace("₹", "").replace(",", "").strip()
-    if ".." in p:
-        p = p.replace("..", ".")
-    return "₹" + p
-
-def main():
-    start_time = time.time()
-
-    print("=== Amazon Top 5 Product Finder (Fast) ===\n")
-
-    target = input("Target Acquisition: ").strip()
-    specs = input("Specifications: ").strip()
-    budget = input("Capital Allocation ₹: ").strip()
-
-    query = f"{target} {specs}"
+    # One translate pass drops both characters; "1,299." + "." + "00" leaves a ".." to fold
+    return "₹" + p.translate(_STRIP_PRICE).strip().replace("..", ".")
+
+def extract_price(soup):
+    """Cleaned price from the whole/fraction spans under `soup`, or None"""
+    whole = _SEL_WHOLE.select_one(soup)
+    frac = _SEL_FRAC.select_one(soup)
+
+    if not whole:
+        return None
+    price = whole.get_text(strip=True)
+    if frac:
+        price += "." + frac.get_text(strip=True)
+    return clean_price(price)
+
+def extract_page_price(html):
+    """extract_price for a raw product page"""
+    tree = lxml.html.fromstring(html)
+    whole = _CSS_WHOLE(tree)
+    frac = _CSS_FRAC(tree)
+
+    if not whole:
+        return None
+    price = whole[0].text_content().strip()
+    if frac:
+        price += "." + frac[0].text_content().strip()
+    return clean_price(price)
+
+async def fetch_price(context, link):
+    """Price from a product page; None on any failure.
+    
+    Amazon's price markup is in the static HTML, so a plain GET is tried first;
+    a browser tab is only opened when that request is refused (non-200, bot check).
+    """
+    html = await _http.fetch_html(link)
+    if html is not None:
+        try:
+            return extract_page_price(html)
+        except Exception:
+            return None
+
+    page = await context.new_page()
+    try:
+        await page.goto(link, timeout=60000)
+        try:
+            await page.wait_for_selector(PRICE_SELECTOR, timeout=6000)
+        except PlaywrightTimeoutError:
+            pass  # No price element - parse whatever loaded
+        return extract_price(BeautifulSoup(await page.content(), "lxml"))
+    except Exception:
+        return None
+    finally:
+        await page.close()
+
+async def find_products(query):
     search_url = f"https://www.amazon.in/s?k={query.replace(' ', '+')}"
 
-    print(f"\n🔍 Searching Amazon for: {query}\n")
-
     results = []
     seen = set()
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(search_url, timeout=60000)
-        page.wait_for_timeout(5000)
-
-        # Scroll to load more items
-        page.mouse.wheel(0, 4000)
-        page.wait_for_timeout(3000)
-
-        soup = BeautifulSoup(page.content(), "html.parser")
-
-        cards = soup.select("div.s-main-slot div[data-component-type='s-search-result']")
-
-        print(f"Found {len(cards)} search result cards.\n")
-
-        # First pass: get prices from search cards
-        fallback_links = []
-
-        for card in cards:
+    context = await _get_context()
+    page = await context.new_page()
+    try:
+        await page.goto(search_url, timeout=60000)
+        try:
+            await page.wait_for_selector(RESULT_SELECTOR, timeout=10000)
+        except PlaywrightTimeoutError:
+            pass
+
+        # Scroll to load more items; the wait returns at once if enough cards are already there
+        await page.mouse.wheel(0, 4000)
+        try:
+            await page.wait_for_function(
+                "sel => document.querySelectorAll(sel).length > 10",
+                arg=RESULT_SELECTOR, timeout=3000
+            )
+        except PlaywrightTimeoutError:
+            pass  # Short result list - parse what loaded
+
+        soup = BeautifulSoup(await page.content(), "lxml")
+    finally:
+        await page.close()
+
+    cards = _SEL_CARDS.select(soup)
+
+    print(f"Found {len(cards)} search result cards.\n")
+
+    # First pass: get prices from search cards
+    fallback_links = []
+
+    for card in cards:
+        if len(results) >= 5:
+            break
+
+        a = _SEL_LINK.select_one(card)
+        if not a:
+            continue
+
+        link = "https://www.amazon.in" + a.get("href").split("?")[0]
+        key = _product_key(link)  # the ASIN, so one product under two paths counts once
+        if key in seen:
+            continue
+        seen.add(key)
+
+        price = extract_price(card)
+        if price:
+            results.append((link, price))
+        else:
+            fallback_links.append(link)
+
+    # Fallback: open product pages only if needed, MAX_OPEN_PAGES tabs at a time
+    for i in range(0, len(fallback_links), MAX_OPEN_PAGES):
+        if len(results) >= 5:
+            break
+        batch = fallback_links[i:i + MAX_OPEN_PAGES]
+        prices = await asyncio.gather(*[fetch_price(context, link) for link in batch])
+        for link, price in zip(batch, prices):
             if len(results) >= 5:
                 break
+            if price:
+                results.append((link, price))
 
-            a = card.select_one("a.a-link-normal.s-no-outline")
-            if not a:
-                continue
+    return results
 
-            link = "https://www.amazon.in" + a.get("href").split("?")[0]
-            if link in seen:
-                continue
-            seen.add(link)
-
-            whole = card.select_one("span.a-price-whole")
-            frac = card.select_one("span.a-price-fraction")
+def main():
+    start_time = time.time()
 
-            if whole:
-                price = whole.get_text(strip=True)
-                if frac:
-                    price += "." + frac.get_text(strip=True)
-                results.append((link, clean_price(price)))
-            else:
-                fallback_links.append(link)
+    print("=== Amazon Top 5 Product Finder (Fast) ===\n")
 
-        # Fallback: open product pages only if needed
-        for link in fallback_links:
-            if len(results) >= 5:
-                break
-            try:
-                page.goto(link, timeout=60000)
-                page.wait_for_timeout(2500)
-                psoup = BeautifulSoup(page.content(), "html.parser")
+    target = input("Target Acquisition: ").strip()
+    specs = input("Specifications: ").strip()
+    budget = input("Capital Allocation ₹: ").strip()
 
-                whole = psoup.select_one("span.a-price-whole")
-                frac = psoup.select_one("span.a-price-fraction")
+    query = f"{target} {specs}"
 
-                if whole:
-                    price = whole.get_text(strip=True)
-                    if frac:
-                        price += "." + frac.get_text(strip=True)
-                    results.append((link, clean_price(price)))
-            except Exception:
-                continue
+    print(f"\n🔍 Searching Amazon for: {query}\n")
 
-        browser.close()
+    results = _run(find_products(query))
 
     for i, (link, price) in enumerate(results, 1):
         print(f"{i}. {link}")
@@ -98,4 +206,7 @@ def main():
     print(f"⏱️ Total time taken: {end_time - start_time:.2f} seconds")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        close()
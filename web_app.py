@@ -1,35 +1,100 @@
-from flask import Flask, request, jsonify, send_file, Response
+from flask import Flask, request, jsonify, Response
+from flask.json.provider import DefaultJSONProvider
+from flask.logging import default_handler
 from flask_cors import CORS
 from controller import NegotiationController
+from model_warmer import ModelWarmer
 from dotenv import load_dotenv
+import atexit
+import functools
+import hashlib
+import logging
+import logging.handlers
 import os
+import queue
 import sys
-import traceback
 import json
 
-# Force unbuffered output
 try:
-    sys.stdout.reconfigure(line_buffering=True)
-except AttributeError:
-    pass  # Not available in all environments
+    import orjson  # serializes straight to bytes in C, so SSE frames skip the str -> utf-8 encode
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def _sse_frame(event) -> bytes:
+        return b"data: " + orjson.dumps(event, option=_ORJSON_OPTS) + b"\n\n"
+except ImportError:
+    orjson = None
+
+    def _sse_frame(event) -> bytes:
+        return f"data: {json.dumps(event)}\n\n".encode()
+
+class _ORJSONProvider(DefaultJSONProvider):
+    """app.json on orjson: request bodies and jsonify() responses are (de)serialized in C"""
+
+    def dumps(self, obj, **kwargs):
+        kwargs.pop('separators', None)  # orjson output is always compact
+        if kwargs:  # e.g. indent in debug mode - leave the formatting to stdlib json
+            return super().dumps(obj, **kwargs)
+        option = _ORJSON_OPTS | orjson.OPT_SORT_KEYS if self.sort_keys else _ORJSON_OPTS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the record as-is; the stock prepare() would format the traceback in the caller"""
+
+    def prepare(self, record):
+        return record
+
+# Endpoint errors are queued and formatted/written by a background thread, so a burst
+# of failures doesn't serialize request threads on traceback formatting and stderr
+_log_queue = queue.Queue(-1)
+_console = logging.StreamHandler(sys.stderr)
+_console.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+_log_listener = logging.handlers.QueueListener(_log_queue, _console)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+app.logger.removeHandler(default_handler)
+app.logger.addHandler(_DeferredQueueHandler(_log_queue))
+if orjson is not None:
+    app.json = _ORJSONProvider(app)
 CORS(app)  # Enable CORS for all routes
 load_dotenv()
 
 BACKEND_ONLY = os.getenv('BACKEND_ONLY', 'false').lower() == 'true'
 
+# Warm the model at boot; /search re-arms it after a negotiation has cleared it
+_WARMER = ModelWarmer()
+_WARMER.start_check_async()
+
+@functools.lru_cache(maxsize=None)
+def _load_page(name):
+    """(body, etag) of a static page, read from disk once per process"""
+    with open(os.path.join(app.root_path, name), 'rb') as f:
+        body = f.read()
+    return body, hashlib.md5(body).hexdigest()
+
+def _send_page(name):
+    body, etag = _load_page(name)
+    response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    # Revalidate every time so a redeploy shows up at once; an unchanged page costs a bodiless 304
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @app.route('/')
 def home():
     if BACKEND_ONLY:
         return jsonify({"status": "ok", "mode": "backend-only", "message": "AURA API is running"})
-    return send_file('index.html')
+    return _send_page('index.html')
 
 @app.route('/search-page')
 def search_page():
     if BACKEND_ONLY:
         return jsonify({"status": "ok"}), 200
-    return send_file('search.html')
+    return _send_page('search.html')
 
 @app.route('/simple')
 def simple():
@@ -47,10 +112,8 @@ def negotiate():
 @app.route('/search', methods=['POST'])
 def search_products_endpoint():
     try:
-        # Start AI Warmup PARALLEL to scraping
-        from model_warmer import ModelWarmer
-        warmer = ModelWarmer()
-        warmer.start_check_async()
+        # Start AI Warmup PARALLEL to scraping (no-op while warm or already checking)
+        _WARMER.start_check_async()
         
         data = request.json
         query = f"{data.get('specs', '')} {data.get('query', '')}".strip()
@@ -63,7 +126,7 @@ def search_products_endpoint():
         
         return jsonify({"products": products})
     except Exception as e:
-        traceback.print_exc()
+        app.logger.exception("/search failed")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/negotiate_chat', methods=['POST'])
@@ -86,7 +149,7 @@ def negotiate_chat_endpoint():
         
         return jsonify(result)
     except Exception as e:
-        traceback.print_exc()
+        app.logger.exception("/negotiate_chat failed")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/negotiate_stream', methods=['POST'])
@@ -106,18 +169,19 @@ def negotiate_stream_endpoint():
                 # Stream each round
                 for event in controller.run_negotiation_streaming(products):
                     # Send Server-Sent Event
-                    yield f"data: {json.dumps(event)}\n\n"
+                    yield _sse_frame(event)
                     
             except Exception as e:
                 error_event = {
                     "type": "error",
                     "message": str(e)
                 }
-                yield f"data: {json.dumps(error_event)}\n\n"
+                yield _sse_frame(error_event)
         
         return Response(
             generate(),
             mimetype='text/event-stream',
+            direct_passthrough=True,  # frames are already bytes
             headers={
                 'Cache-Control': 'no-cache',
                 'X-Accel-Buffering': 'no'
@@ -125,7 +189,7 @@ def negotiate_stream_endpoint():
         )
         
     except Exception as e:
-        traceback.print_exc()
+        app.logger.exception("/negotiate_stream failed")
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':